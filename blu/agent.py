@@ -13,12 +13,34 @@ DIRS = {
     "up": (0, -1),
 }
 
+# tuning constants (tune.py overrides them within PARAM_SPACE)
+PARAMS = {
+    "unknown_cost": 4,        # path cost of an unknown tile
+    "forward_bias": 0.7,      # how much frontiers towards the enemy are preferred
+    "revisit_penalty": 2.5,   # extra score for frontiers that were visited recently
+    "recent_length": 6,       # positions remembered against loops
+}
+PARAM_SPACE = {
+    "unknown_cost": (1, 10),
+    "forward_bias": (0.0, 2.0),
+    "revisit_penalty": (0.0, 6.0),
+    "recent_length": (2, 16),
+}
+
 class Agent:
+    # ask the engine for the match settings (map size can differ from config.py)
+    wants_config = True
+    # visible_world as a tuple of row strings (indexed the same way, no list copies)
+    observation = "rows"
 
-    def __init__(self, color, index):
+    def __init__(self, color, index, config=None):
         self.color = color
         self.index = index
 
+        self.width = config.width if config else WIDTH
+        self.height = config.height if config else HEIGHT
+        self.vision_range = config.agent_vision_range if config else AGENT_VISION_RANGE
+
         self.enemy_flag_tile = ASCII_TILES["red_flag"] if color == "blue" else ASCII_TILES["blue_flag"]
         self.home_flag_tile  = ASCII_TILES["blue_flag"] if color == "blue" else ASCII_TILES["red_flag"]
 
@@ -30,7 +52,7 @@ class Agent:
         self.pending_target = None
 
         # anti-loop
-        self.recent = deque(maxlen=6)
+        self.recent = deque(maxlen=PARAMS["recent_length"])
         self.stuck_count = 0
 
     # ---------- Shared knowledge ----------
@@ -41,7 +63,7 @@ class Agent:
 
     def _update_shared_map(self, visible_world, position, sk):
         cx, cy = position
-        r = AGENT_VISION_RANGE
+        r = self.vision_range
         m = sk["map"]
 
         for dy in range(-r, r + 1):
@@ -82,14 +104,14 @@ class Agent:
     # ---------- Pathfinding (Dijkstra with unknown penalty) ----------
     def _tile_cost(self, sk_map, x, y):
         # out of bounds are walls :contentReference[oaicite:2]{index=2}
-        if x <= 0 or y <= 0 or x >= WIDTH - 1 or y >= HEIGHT - 1:
+        if x <= 0 or y <= 0 or x >= self.width - 1 or y >= self.height - 1:
             return None  # impassable
 
         t = sk_map.get((x, y), None)
         if t == WALL:
             return None
         if t is None:
-            return 4  # UNKNOWN penalty (optimistic but cautious)
+            return PARAMS["unknown_cost"]  # UNKNOWN penalty (optimistic but cautious)
         return 1      # known empty/flags
 
     def _dijkstra_next_step(self, start, goal, sk_map):
@@ -153,10 +175,10 @@ class Agent:
                 continue
             dist = abs(x - px) + abs(y - py)
             forward = (x - px) * self.enemy_bias_dx  # prefer forward
-            score = dist - 0.7 * forward
+            score = dist - PARAMS["forward_bias"] * forward
 
             if (x, y) in self.recent:
-                score += 2.5
+                score += PARAMS["revisit_penalty"]
 
             if best_score is None or score < best_score:
                 best_score = score
@@ -169,8 +191,8 @@ class Agent:
         # aim a point forward + small vertical variation by agent index to spread
         target_x = px + 6 * self.enemy_bias_dx
         target_y = py + ((self.index % 3) - 1) * 2
-        target_x = max(1, min(WIDTH - 2, target_x))
-        target_y = max(1, min(HEIGHT - 2, target_y))
+        target_x = max(1, min(self.width - 2, target_x))
+        target_y = max(1, min(self.height - 2, target_y))
         return (target_x, target_y)
 
     # ---------- Move decision ----------
@@ -0,0 +1,85 @@
+"""
+Content-addressed cache of match results.
+
+A match is identified by a hash of everything that decides its outcome: the
+Python sources of both team folders, the seed, the engine sources (including
+config.py, whose settings agents import) and the rules that differ from the
+defaults. Changing any of these gives a new key, so stale results are never
+served and nothing has to be invalidated by hand. Renaming or copying a team
+folder keeps its cached results, since only the contents count.
+
+Results are stored as one small JSON file per match under the cache directory.
+"""
+
+import os
+import json
+import hashlib
+from functools import lru_cache
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules whose code decides how a match plays out
+ENGINE_FILES = ("tournament.py", "match.py", "config.py", "fairness.py", "player_input.py")
+CACHE_VERSION = 1 # bump to drop every cached result after a change in the result format
+
+def _hash_files(paths, root):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.relpath(path, root).replace(os.sep, "/").encode() + b"\0")
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+@lru_cache(maxsize=None)
+def engine_hash():
+    return _hash_files([os.path.join(ENGINE_DIR, name) for name in ENGINE_FILES], ENGINE_DIR)
+
+def team_hash(folder):
+    """Hash of every .py file in a team folder (and its subfolders)."""
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(".py"))
+    return _hash_files(paths, folder)
+
+def match_key(blue_hash, red_hash, seed, rules=None):
+    spec = {"version": CACHE_VERSION, "engine": engine_hash(), "blue": blue_hash, "red": red_hash,
+            "seed": seed, "rules": rules or {}}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+class ResultCache:
+
+    def __init__(self, directory=".cache/results"):
+        self.directory = directory
+        self._team_hashes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, blue_team, red_team, seed, rules=None):
+        """Cache key of a match; team folders are hashed once per cache object."""
+        for team in (blue_team, red_team):
+            if team not in self._team_hashes:
+                self._team_hashes[team] = team_hash(team)
+        return match_key(self._team_hashes[blue_team], self._team_hashes[red_team], seed, rules)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        """The cached result, or None."""
+        try:
+            with open(self._path(key)) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp, path)
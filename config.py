@@ -1,8 +1,11 @@
+import dataclasses as _dataclasses
+
 # World settings
 HEIGHT = 24
 WIDTH = 32
 TICK_RATE = 0.01  # Lower is faster
 MAX_TICKS = 6000  # Game ends in a tie after this many ticks
+STALEMATE_WINDOW = 0 # End in a tie after this many ticks without progress (0 = off)
 
 # Update intervals (in ticks)
 AGENT_UPDATE_INTERVAL = 5
@@ -13,6 +16,10 @@ AGENT_VISION_RANGE = 4
 SHOOT_COOLDOWN = 4 # Ticks an agent must wait before shooting
 AGENT_MAX_HP = 3
 AGENT_MAX_AMMO = 10
+# Seconds per tick for agents with a think() method, between agent frames. Off by
+# default: how much gets done in the budget depends on the machine, so seeded
+# matches (and cached results) are only reproducible with 0.
+THINK_BUDGET = 0
 
 # Healing and Resupply
 HEAL_RESUPPLY_RATE = 100 # Ticks between each heal/resupply tick
@@ -30,4 +37,55 @@ ASCII_TILES = {
     "red_flag": "}",
     "bullet": ".",
     "unknown": "/"
-}
\ No newline at end of file
+}
+# Teams and map generation
+TEAM_SIZE = 3 # Agents per team
+WALL_DENSITY = 0.3 # Chance of a wall on each inner tile
+MIN_MAP_FAIRNESS = 0 # Regenerate maps with a lower fairness score (0 to 1, see fairness.py)
+
+
+@_dataclasses.dataclass
+class GameConfig:
+    """
+    The rules of one match. Defaults are the settings above, so several matches
+    with different settings can run side by side in one process.
+    Field names are the lowercase names of the settings.
+    """
+    height: int = HEIGHT
+    width: int = WIDTH
+    tick_rate: float = TICK_RATE
+    max_ticks: int = MAX_TICKS
+    stalemate_window: int = STALEMATE_WINDOW
+    agent_update_interval: int = AGENT_UPDATE_INTERVAL
+    bullet_update_interval: int = BULLET_UPDATE_INTERVAL
+    agent_vision_range: int = AGENT_VISION_RANGE
+    shoot_cooldown: int = SHOOT_COOLDOWN
+    agent_max_hp: int = AGENT_MAX_HP
+    agent_max_ammo: int = AGENT_MAX_AMMO
+    think_budget: float = THINK_BUDGET
+    heal_resupply_rate: int = HEAL_RESUPPLY_RATE
+    heal_resupply_range: int = HEAL_RESUPPLY_RANGE
+    team_size: int = TEAM_SIZE
+    wall_density: float = WALL_DENSITY
+    min_map_fairness: float = MIN_MAP_FAIRNESS
+
+    @classmethod
+    def from_rules(cls, rules=None):
+        """Builds a config from overrides keyed by setting name, e.g. {"MAX_TICKS": 3000}."""
+        names = {field.name for field in _dataclasses.fields(cls)}
+        overrides = {}
+        for name, value in (rules or {}).items():
+            if name.lower() not in names:
+                raise ValueError(f"Unknown game rule: {name}")
+            overrides[name.lower()] = value
+        return cls(**overrides)
+
+    def replace(self, **changes):
+        """A copy of this config with some fields changed."""
+        return _dataclasses.replace(self, **changes)
+
+    def rules(self):
+        """The settings that differ from the defaults, keyed by setting name."""
+        default = GameConfig()
+        return {name.upper(): value for name, value in _dataclasses.asdict(self).items()
+                if getattr(default, name) != value}
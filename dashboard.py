@@ -0,0 +1,144 @@
+"""
+Live terminal dashboard for batch and tournament runs (python run_tests.py --dashboard).
+
+Results are added as they arrive, which only updates a few counters. The
+screen is redrawn at a fixed low rate, so the cost stays the same no matter
+how many workers report. When the output is not a terminal, a single status
+line is printed instead of redrawing the screen.
+"""
+
+import sys
+import time
+import math
+from collections import deque, defaultdict
+
+def _duration(seconds):
+    if seconds is None or math.isinf(seconds):
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class Dashboard:
+
+    def __init__(self, total, done=0, workers=1, refresh=1.0, window=60.0, out=None):
+        self.total = total
+        self.done = done           # finished before this run, e.g. from a resumed manifest
+        self.failed = 0
+        self.in_flight = 0
+        self.workers = workers
+        self.refresh = refresh
+        self.window = window       # seconds over which throughput is measured
+        self.out = out or sys.stdout
+        self.interactive = self.out.isatty()
+        if not self.interactive:
+            self.refresh = max(refresh, 10.0) # log files need far fewer lines
+
+        self.start = time.monotonic()
+        self.next_draw = 0
+        self.recent = deque()      # (time, ticks) of recently finished matches
+        self.busy = defaultdict(float)  # worker -> seconds spent playing
+
+        # team -> [wins, ties, losses]
+        self.records = defaultdict(lambda: [0, 0, 0])
+        # team -> [seconds in Agent.update, calls]
+        self.update_times = defaultdict(lambda: [0.0, 0])
+
+    # ---------- Events ----------
+    def started(self, job):
+        self.in_flight += 1
+
+    def finished(self, key, result, error):
+        self.in_flight -= 1
+        if error:
+            self.failed += 1
+            return
+        self.done += 1
+        now = time.monotonic()
+        self.recent.append((now, result["ticks"]))
+        if "worker" in result:
+            self.busy[result["worker"]] += result.get("seconds", 0.0)
+        self.add_result(result)
+
+    def add_result(self, result):
+        """Adds a result to the standings only (e.g. one finished in an earlier run)."""
+        teams = {"blue": result["blue_team"], "red": result["red_team"]}
+        for color, team in teams.items():
+            record = self.records[team]
+            if result["winner"] == "tied":
+                record[1] += 1
+            elif result["winner"] == color:
+                record[0] += 1
+            else:
+                record[2] += 1
+            if "update_time" in result:
+                self.update_times[team][0] += result["update_time"][color]
+                self.update_times[team][1] += result["update_calls"][color]
+
+    # ---------- Statistics ----------
+    def throughput(self):
+        """(games/s, ticks/s) over the last `window` seconds."""
+        now = time.monotonic()
+        while self.recent and self.recent[0][0] < now - self.window:
+            self.recent.popleft()
+        # At least one second, so the first results do not give absurd rates
+        span = max(1.0, min(self.window, now - self.start))
+        if not self.recent:
+            return 0.0, 0.0
+        return len(self.recent) / span, sum(ticks for _, ticks in self.recent) / span
+
+    def standings(self, z=1.96):
+        """(team, score, low, high, games, record) sorted by score; score counts ties as half a win."""
+        rows = []
+        for team, (wins, ties, losses) in self.records.items():
+            games = wins + ties + losses
+            score = (wins + 0.5 * ties) / games
+            # Normal approximation with the sample variance of the per-game scores
+            variance = (wins + 0.25 * ties) / games - score ** 2
+            margin = z * math.sqrt(max(variance, 0.0) / games)
+            rows.append((team, score, max(0.0, score - margin), min(1.0, score + margin), games, (wins, ties, losses)))
+        return sorted(rows, key=lambda row: -row[1])
+
+    # ---------- Output ----------
+    def lines(self):
+        elapsed = time.monotonic() - self.start
+        games_per_second, ticks_per_second = self.throughput()
+        remaining = self.total - self.done - self.failed # failed matches are not played again
+        eta = remaining / games_per_second if games_per_second else None
+
+        lines = [
+            f"Matches  {self.done}/{self.total} done, {self.in_flight} in flight, {self.failed} failed"
+            f"    elapsed {_duration(elapsed)}  ETA {_duration(eta) if remaining else 'done'}",
+            f"Speed    {games_per_second:.2f} games/s, {ticks_per_second:,.0f} ticks/s",
+        ]
+        if self.busy and elapsed > 0:
+            shares = [min(1.0, busy / elapsed) for busy in self.busy.values()]
+            lines.append(f"Workers  {self.workers}, busy {100 * sum(shares) / self.workers:.0f}% "
+                         f"(least busy {100 * min(shares):.0f}%, most {100 * max(shares):.0f}%)")
+
+        lines.append("")
+        lines.append("Standings (score = wins + ties/2, 95% interval)")
+        for rank, (team, score, low, high, games, (w, t, l)) in enumerate(self.standings(), 1):
+            lines.append(f"  {rank:>2}. {team:<20} {score:.3f}  [{low:.3f}, {high:.3f}]  {games:>6} games  {w}-{t}-{l}")
+
+        slowest = sorted(((seconds / calls, team, calls) for team, (seconds, calls) in self.update_times.items() if calls),
+                         reverse=True)[:5]
+        if slowest:
+            lines.append("")
+            lines.append("Slowest agents (mean Agent.update time)")
+            for mean, team, calls in slowest:
+                lines.append(f"  {team:<24} {1000 * mean:8.3f} ms  ({calls:,} updates)")
+        return lines
+
+    def draw(self, force=False):
+        """Redraws at most every `refresh` seconds (or now, if forced)."""
+        now = time.monotonic()
+        if not force and now < self.next_draw:
+            return
+        self.next_draw = now + self.refresh
+        lines = self.lines()
+        if self.interactive:
+            # Cursor home and clear screen, then the whole dashboard in one write
+            self.out.write("\033[H\033[J" + "\n".join(lines) + "\n")
+        else:
+            self.out.write(lines[0] + "  |  " + lines[1] + "\n")
+        self.out.flush()
@@ -0,0 +1,256 @@
+"""
+Training data export: records what agents see and do in headless matches, for
+training learned agents by imitating scripted ones.
+
+Every agent frame of a recorded agent becomes one sample:
+    obs      uint8 (S, S)  visible_world as tile codes (see TILES), S = 2*AGENT_VISION_RANGE+1
+    state    int16 (6,)    x, y, can_shoot, holding_flag, hp, ammo
+    action   uint8         0 = nothing, 1-4 = move, 5-8 = shoot (see ACTIONS)
+    outcome  int8          1 if the agent's team won the match, 0 for a tie, -1 if it lost
+    meta     int32 (4,)    match id (the seed, -1 if unseeded), tick, colour (0 blue, 1 red), agent index
+
+Samples are written in shards of a fixed number of rows (the last one of each
+worker may be smaller). A shard is a directory with one .npy file per field,
+so it can be opened with np.load(..., mmap_mode="r") without reading it into
+memory. ShardDataset does this for a whole output directory.
+
+Usage:
+    python dataset.py blu red --games 1000 --both-colours --record blu --workers 4 --out data
+"""
+
+import os
+import json
+import argparse
+from multiprocessing import Pool
+import numpy as np
+from config import *
+
+TILES = ("empty", "wall", "blue_agent", "red_agent", "blue_agent_f", "red_agent_f",
+         "blue_flag", "red_flag", "bullet", "unknown")
+ACTIONS = (None, ("move", "right"), ("move", "left"), ("move", "up"), ("move", "down"),
+           ("shoot", "right"), ("shoot", "left"), ("shoot", "up"), ("shoot", "down"))
+FIELDS = ("obs", "state", "action", "outcome", "meta")
+SHARD_SIZE = 65536
+
+# ASCII byte -> tile code, so a whole window is encoded with one lookup
+_TILE_CODES = np.full(256, TILES.index("unknown"), dtype=np.uint8)
+for _code, _name in enumerate(TILES):
+    _TILE_CODES[ord(ASCII_TILES[_name])] = _code
+_ACTION_CODES = {action: code for code, action in enumerate(ACTIONS) if action}
+
+def encode_action(action, direction):
+    """Anything that is not a move or shot in a valid direction is encoded as 0 (do nothing)."""
+    return _ACTION_CODES.get((action, direction), 0)
+
+def decode_action(code):
+    """Returns (action, direction), or (None, None) for 0."""
+    return ACTIONS[code] or (None, None)
+
+def one_hot(obs):
+    """Tile codes of shape (..., S, S) as float32 planes of shape (..., len(TILES), S, S)."""
+    planes = np.zeros(obs.shape[:-2] + (len(TILES),) + obs.shape[-2:], dtype=np.float32)
+    np.put_along_axis(planes, obs[..., None, :, :].astype(np.intp), 1.0, axis=-3)
+    return planes
+
+
+class ShardWriter:
+    """
+    Collects samples (as the `recorder` of a World) and writes full shards.
+
+    Samples of a match are staged until it ends, because they are labelled with
+    its outcome. Shards are written to a temporary name and renamed when
+    complete, so readers never see half-written shards.
+    """
+
+    def __init__(self, directory, prefix="shard", shard_size=SHARD_SIZE, vision_range=AGENT_VISION_RANGE):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.window = vision_range*2+1
+        self.shards_written = 0
+        self.samples_written = 0
+        os.makedirs(directory, exist_ok=True)
+        # Continue after shards from an earlier run instead of overwriting them
+        self.next_shard = sum(1 for name in os.listdir(directory) if name.startswith(prefix + "-"))
+
+        self.shard = self._allocate(shard_size)
+        self.shard_rows = 0
+        self.staged = self._allocate(1024)
+        self.staged_rows = 0
+        self.match_id = 0
+
+    def _allocate(self, rows):
+        return {
+            "obs": np.empty((rows, self.window, self.window), dtype=np.uint8),
+            "state": np.empty((rows, 6), dtype=np.int16),
+            "action": np.empty(rows, dtype=np.uint8),
+            "outcome": np.empty(rows, dtype=np.int8),
+            "meta": np.empty((rows, 4), dtype=np.int32),
+        }
+
+    # ---------- Called by the engine ----------
+    def begin_match(self, world, match_id=0):
+        if world.config.agent_vision_range*2+1 != self.window:
+            raise ValueError(f"Writer for {self.window}x{self.window} observations cannot record "
+                             f"vision range {world.config.agent_vision_range}")
+        self.match_id = match_id
+        self.staged_rows = 0
+
+    def record(self, agent, world, action, direction):
+        """agent._vision holds this frame's masked window as ASCII bytes."""
+        if self.staged_rows == len(self.staged["action"]):
+            grown = self._allocate(2 * self.staged_rows)
+            for field in FIELDS:
+                grown[field][:self.staged_rows] = self.staged[field][:self.staged_rows]
+            self.staged = grown
+
+        row = self.staged_rows
+        vision = np.frombuffer(agent._vision, dtype=np.uint8)
+        self.staged["obs"][row] = _TILE_CODES[vision].reshape(self.window, self.window)
+        self.staged["state"][row] = (agent.position[0], agent.position[1], agent.can_shoot,
+                                     agent.holding_flag is not None, agent.hp, agent.ammo)
+        self.staged["action"][row] = encode_action(action, direction)
+        self.staged["meta"][row] = (self.match_id, world.tick, agent.color != "blue", agent.index)
+        self.staged_rows += 1
+
+    def end_match(self, world):
+        """Labels the match's samples with its outcome and moves them into shards."""
+        rows = self.staged_rows
+        winner = world.win[0] if world.win else None
+        if winner in ("blue", "red"):
+            # meta[:, 2] is 0 for blue agents and 1 for red ones
+            won = self.staged["meta"][:rows, 2] == (winner == "red")
+            self.staged["outcome"][:rows] = np.where(won, 1, -1)
+        else:
+            self.staged["outcome"][:rows] = 0
+
+        start = 0
+        while start < rows:
+            count = min(rows - start, self.shard_size - self.shard_rows)
+            for field in FIELDS:
+                self.shard[field][self.shard_rows:self.shard_rows + count] = self.staged[field][start:start + count]
+            self.shard_rows += count
+            start += count
+            if self.shard_rows == self.shard_size:
+                self.flush()
+        self.staged_rows = 0
+
+    # ---------- Output ----------
+    def flush(self):
+        """Writes the collected samples as a shard (a smaller one if it is not full)."""
+        if self.shard_rows == 0:
+            return
+        name = f"{self.prefix}-{self.next_shard:05d}"
+        tmp = os.path.join(self.directory, name + ".tmp")
+        os.makedirs(tmp, exist_ok=True)
+        for field in FIELDS:
+            np.save(os.path.join(tmp, field + ".npy"), self.shard[field][:self.shard_rows])
+        os.replace(tmp, os.path.join(self.directory, name))
+        self.next_shard += 1
+        self.shards_written += 1
+        self.samples_written += self.shard_rows
+        self.shard_rows = 0
+
+    def close(self):
+        self.flush()
+
+
+def load_shard(path):
+    """Memory-maps the fields of one shard. Returns a dict of read-only arrays."""
+    return {field: np.load(os.path.join(path, field + ".npy"), mmap_mode="r") for field in FIELDS}
+
+class ShardDataset:
+    """
+    All shards in a directory, memory-mapped. Indexing with a single row, a
+    slice or an array of rows returns a dict of arrays for those samples.
+    """
+
+    def __init__(self, directory):
+        names = sorted(name for name in os.listdir(directory)
+                       if os.path.isdir(os.path.join(directory, name)) and not name.endswith(".tmp"))
+        self.shards = [load_shard(os.path.join(directory, name)) for name in names]
+        sizes = [len(shard["action"]) for shard in self.shards]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, rows):
+        rows = np.arange(len(self))[rows] if isinstance(rows, slice) else np.asarray(rows)
+        single = rows.ndim == 0
+        rows = np.atleast_1d(rows)
+        shard_of_row = np.searchsorted(self.offsets, rows, side="right") - 1
+        batch = {}
+        for field in FIELDS:
+            sample = self.shards[0][field]
+            batch[field] = np.empty((len(rows),) + sample.shape[1:], dtype=sample.dtype)
+        for shard in np.unique(shard_of_row):
+            picked = shard_of_row == shard
+            local = rows[picked] - self.offsets[shard]
+            for field in FIELDS:
+                batch[field][picked] = self.shards[shard][field][local]
+        return {field: array[0] for field, array in batch.items()} if single else batch
+
+    def batches(self, batch_size, shuffle=True, seed=None):
+        """Yields batches of samples; shuffled batches gather rows from all shards."""
+        rows = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(rows)
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            yield self[chunk]
+
+
+def _record_games(task):
+    """Worker process: plays its seeds and writes its own shards."""
+    from match import run_match
+    worker, pairings, seeds, record, out, shard_size, rules = task
+    config = GameConfig.from_rules(rules)
+    writer = ShardWriter(out, f"w{worker:02d}", shard_size, config.agent_vision_range)
+    for blue, red in pairings:
+        colors = [color for color, team in (("blue", blue), ("red", red))
+                  if not record or os.path.normpath(team) in record]
+        for seed in seeds:
+            run_match(blue, red, seed=seed, config=config, recorder=writer, record_colors=colors)
+    writer.close()
+    return writer.samples_written, writer.shards_written
+
+def main(args):
+    pairings = [(args.blue_team_folder, args.red_team_folder)]
+    if args.both_colours:
+        pairings.append((args.red_team_folder, args.blue_team_folder))
+    rules = json.loads(args.rules) if args.rules else None
+    GameConfig.from_rules(rules) # fail early on unknown settings
+
+    # "blu", "./blu" and "blu/" are the same team
+    record = [os.path.normpath(team) for team in args.record] if args.record else None
+
+    seeds = list(range(args.seed, args.seed + args.games))
+    workers = max(1, args.workers)
+    chunks = [seeds[i::workers] for i in range(workers)]
+    tasks = [(worker, pairings, chunk, record, args.out, args.shard_size, rules)
+             for worker, chunk in enumerate(chunks) if chunk]
+    if not tasks:
+        print("No games to record")
+        return
+
+    samples = shards = 0
+    with Pool(len(tasks)) as pool:
+        for written, count in pool.imap_unordered(_record_games, tasks):
+            samples += written
+            shards += count
+    print(f"Wrote {samples} samples in {shards} shards to {args.out}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record observation/action samples from headless matches")
+    parser.add_argument("blue_team_folder")
+    parser.add_argument("red_team_folder")
+    parser.add_argument("--games", type=int, default=100, help="Games per pairing")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--both-colours", action="store_true", help="Also play with the colours swapped")
+    parser.add_argument("--record", nargs="*", default=None, help="Only record these team folders (default: both)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="Samples per shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--rules", default=None, help='JSON overrides of config.py, e.g. \'{"MAX_TICKS": 3000}\'')
+    parser.add_argument("--out", default="data", help="Output directory")
+    main(parser.parse_args())
@@ -0,0 +1,272 @@
+"""
+Distributes matches over any number of machines through a shared work queue.
+
+The queue is a directory (local, or shared over NFS/SMB between machines):
+
+    QUEUE_DIR/pending/   match specs waiting for a worker
+    QUEUE_DIR/running/   specs claimed by a worker (moved there atomically, under a name
+                     of their own per claim)
+    QUEUE_DIR/done/      match results
+    QUEUE_DIR/failed/    specs that failed on every retry
+
+The coordinator publishes match specs (team folders, seed, rules) and collects
+results into results.csv. Workers pull specs, run them with the headless engine
+and push the results back. Failed jobs, and jobs whose worker disappeared,
+are put back in the queue until they run out of retries. A worker touches the
+spec of the match it plays every few seconds, so only workers that stopped
+doing that lose their lease, not those playing a long match. A worker that
+lost its lease can no longer touch the job, even once another worker has
+claimed it again.
+
+Every coordinator run gives its jobs its own id prefix and only collects
+results with that prefix, so files left over from earlier runs on the same
+queue directory are never taken for new results.
+
+Usage:
+    python distributed.py coordinator QUEUE_DIR blu red --games 20
+    python distributed.py coordinator QUEUE_DIR team1 team2 team3 --games 10    # round-robin
+    python distributed.py worker QUEUE_DIR
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+import traceback
+import manifest
+from match import run_match, log_match_result
+
+SUBDIRS = ("pending", "running", "done", "failed")
+
+class DirectoryQueue:
+
+    def __init__(self, root):
+        self.root = root
+        for sub in SUBDIRS:
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def _path(self, sub, name):
+        return os.path.join(self.root, sub, name)
+
+    def _write_json(self, sub, name, data):
+        # Write to a temporary file first so readers never see a half-written job
+        tmp = self._path(sub, f".{name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self._path(sub, name))
+
+    def _read_json(self, sub, name):
+        with open(self._path(sub, name)) as f:
+            return json.load(f)
+
+    def _list(self, sub):
+        return sorted(name for name in os.listdir(os.path.join(self.root, sub)) if name.endswith(".json"))
+
+    # ---------- Coordinator side ----------
+    def publish(self, job):
+        self._write_json("pending", f"{job['id']}.json", job)
+
+    def collect(self, prefix=""):
+        """Returns (and removes) the results pushed back by workers for jobs whose id starts with prefix."""
+        results = []
+        for name in self._list("done"):
+            if not name.startswith(prefix):
+                continue
+            try:
+                results.append(self._read_json("done", name))
+            except (IOError, ValueError):
+                continue # still being written
+            os.remove(self._path("done", name))
+        return results
+
+    def failed(self, prefix=""):
+        return [self._read_json("failed", name) for name in self._list("failed") if name.startswith(prefix)]
+
+    def requeue_stale(self, lease_seconds):
+        """Puts back jobs whose worker has not finished them within the lease."""
+        now = time.time()
+        requeued = 0
+        for name in self._list("running"):
+            path = self._path("running", name)
+            try:
+                if now - os.path.getmtime(path) < lease_seconds:
+                    continue
+                job = self._read_json("running", name)
+            except (IOError, ValueError):
+                continue
+            self._retry_or_fail(job, name, "lease expired")
+            requeued += 1
+        return requeued
+
+    def outstanding(self):
+        return len(self._list("pending")) + len(self._list("running"))
+
+    # ---------- Worker side ----------
+    def claim(self, worker_id):
+        """
+        Atomically moves one pending job to running. Returns (job, name) or None.
+        The running file is named after the claim, so a job handed back and
+        claimed again never shares it with the worker that lost the lease.
+        """
+        for pending in self._list("pending"):
+            name = f"{pending[:-len('.json')]}@{uuid.uuid4().hex[:12]}.json"
+            try:
+                os.rename(self._path("pending", pending), self._path("running", name))
+            except OSError:
+                continue # another worker was faster
+            # Renaming keeps the old mtime, touch it so the lease starts now
+            os.utime(self._path("running", name))
+            job = self._read_json("running", name)
+            job["worker"] = worker_id
+            return job, name
+        return None
+
+    def heartbeat(self, name):
+        """Renews the lease of a running job."""
+        try:
+            os.utime(self._path("running", name))
+        except FileNotFoundError:
+            pass # the lease had already expired and the job was handed back
+
+    def complete(self, job, name, result):
+        result["id"] = job["id"]
+        result["worker"] = job.get("worker")
+        self._write_json("done", f"{job['id']}.json", result)
+        self._remove_running(name)
+
+    def fail(self, job, name, error):
+        self._retry_or_fail(job, name, error)
+
+    def _retry_or_fail(self, job, name, error):
+        if not os.path.exists(self._path("running", name)):
+            return # the lease expired and the job was handed back already
+        job["attempts"] = job.get("attempts", 0) + 1
+        job.setdefault("errors", []).append(error)
+        sub = "pending" if job["attempts"] <= job.get("retries", 0) else "failed"
+        job.pop("worker", None)
+        self._write_json(sub, f"{job['id']}.json", job)
+        self._remove_running(name)
+
+    def _remove_running(self, name):
+        try:
+            os.remove(self._path("running", name))
+        except FileNotFoundError:
+            pass
+
+
+def make_jobs(teams, games, first_seed=0, both_colours=False, retries=2, rules=None, run_id="run"):
+    """
+    Builds the match specs for a batch (two teams) or a round-robin tournament
+    (more teams), with the same pairings as manifest.make_jobs. Job ids start
+    with run_id.
+    """
+    jobs = []
+    for match in manifest.make_jobs(teams, games, first_seed, both_colours):
+        blue, red, seed = match["blue_team"], match["red_team"], match["seed"]
+        jobs.append({
+            "id": f"{run_id}-{os.path.basename(os.path.normpath(blue))}-{os.path.basename(os.path.normpath(red))}-{seed}",
+            "blue_team": blue,
+            "red_team": red,
+            "seed": seed,
+            "rules": rules or {},
+            "retries": retries,
+        })
+    return jobs
+
+def coordinator(args):
+    queue = DirectoryQueue(args.queue_dir)
+    rules = json.loads(args.rules) if args.rules else {}
+    run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+    jobs = make_jobs(args.teams, args.games, args.seed,
+                     args.both_colours, args.retries, rules, run_id)
+    for job in jobs:
+        queue.publish(job)
+    print(f"Published {len(jobs)} matches to {args.queue_dir} (run {run_id})")
+
+    remaining = {job["id"] for job in jobs}
+    while remaining:
+        for result in queue.collect(run_id + "-"):
+            if result["id"] not in remaining:
+                continue # duplicate from a worker whose lease had expired
+            remaining.discard(result["id"])
+            log_match_result(result["blue_team"], result["red_team"], result["winner"], result["reason"], args.results)
+            print(f"  {result['id']}: {result['winner']} ({result['reason']}) by {result['worker']}")
+
+        for job in queue.failed(run_id + "-"):
+            if job["id"] in remaining:
+                remaining.discard(job["id"])
+                print(f"  {job['id']}: FAILED after {job['attempts']} attempts: {job['errors'][-1]}")
+
+        if queue.requeue_stale(args.lease):
+            print("  Requeued matches from unresponsive workers")
+        if remaining:
+            time.sleep(args.poll)
+
+    print("Done.")
+    print(f"Results saved in {args.results}")
+
+def worker(args):
+    queue = DirectoryQueue(args.queue_dir)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Worker {worker_id} pulling from {args.queue_dir}")
+
+    while True:
+        claimed = queue.claim(worker_id)
+        if claimed is None:
+            if args.exit_when_empty and queue.outstanding() == 0:
+                break
+            time.sleep(args.poll)
+            continue
+
+        job, name = claimed
+        # Keep the lease while the match runs
+        playing = threading.Event()
+        def beat():
+            while not playing.wait(args.heartbeat):
+                queue.heartbeat(name)
+        heart = threading.Thread(target=beat, daemon=True)
+        heart.start()
+        try:
+            result = run_match(job["blue_team"], job["red_team"], seed=job["seed"], rules=job.get("rules"))
+        except Exception:
+            queue.fail(job, name, traceback.format_exc(limit=3))
+            print(f"  {job['id']}: error, handed back to the queue")
+            continue
+        finally:
+            playing.set()
+            heart.join()
+        queue.complete(job, name, result)
+        print(f"  {job['id']}: {result['winner']} ({result['reason']})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed match runner")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p = sub.add_parser("coordinator", help="Publish matches and collect results")
+    p.add_argument("queue_dir", help="Shared queue directory")
+    p.add_argument("teams", nargs="+", help="Team folders; more than two play a round-robin")
+    p.add_argument("--games", type=int, default=20, help="Games per pairing")
+    p.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    p.add_argument("--both-colours", action="store_true", help="Also play with the colours swapped")
+    p.add_argument("--rules", default=None, help='Rule overrides as JSON, e.g. \'{"MAX_TICKS": 3000}\'')
+    p.add_argument("--retries", type=int, default=2, help="Retries for a failed match")
+    p.add_argument("--lease", type=float, default=600, help="Seconds without a heartbeat before a running match is considered lost")
+    p.add_argument("--poll", type=float, default=0.5, help="Seconds between queue scans")
+    p.add_argument("--results", default="results.csv", help="CSV file results are appended to")
+
+    p = sub.add_parser("worker", help="Pull and run matches")
+    p.add_argument("queue_dir", help="Shared queue directory")
+    p.add_argument("--poll", type=float, default=1.0, help="Seconds between queue scans when idle")
+    p.add_argument("--heartbeat", type=float, default=30, help="Seconds between lease renewals while playing (keep below the coordinator's --lease)")
+    p.add_argument("--exit-when-empty", action="store_true", help="Stop once no matches are pending or running")
+
+    args = parser.parse_args()
+    if args.mode == "coordinator" and len(args.teams) < 2:
+        parser.error("at least two teams are needed")
+    if args.mode == "coordinator":
+        coordinator(args)
+    else:
+        worker(args)
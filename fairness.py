@@ -0,0 +1,206 @@
+"""
+Map fairness analysis.
+
+Random maps can favour one side: one team may have a much shorter walk to the
+enemy flag, or a flag that can only be reached through a single chokepoint, or
+a heal zone that can be shot into from far more tiles. analyze_map() measures
+these per side and combines their differences into a score from 0 (very
+unfair, or a flag is unreachable) to 1 (both sides alike).
+
+The score is used by World.generate_world to regenerate maps below
+MIN_MAP_FAIRNESS (config.py), and by fair_seeds() to pick seeds for batches.
+
+Usage:
+    python fairness.py --seeds 0-99              # score of every seed's map
+    python fairness.py --count 40 --min 0.8      # first 40 seeds with fair maps
+"""
+
+import sys
+import random
+import argparse
+from collections import deque, defaultdict
+from config import *
+
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+MAX_ROUTES = 4 # disjoint routes are only counted up to this many
+SEEDS_PER_FAIR_SEED = 100 # seeds tried per requested fair seed before giving up
+
+def _passable(worldmap, x, y):
+    return 0 <= y < len(worldmap) and 0 <= x < len(worldmap[0]) and worldmap[y][x] != ASCII_TILES["wall"]
+
+def bfs_distances(worldmap, start, blocked=()):
+    """Shortest walking distance from start to every reachable tile."""
+    dist = {start: 0}
+    queue = deque([start])
+    while queue:
+        x, y = queue.popleft()
+        d = dist[(x, y)] + 1
+        for dx, dy in DIRECTIONS:
+            nxt = (x + dx, y + dy)
+            if nxt not in dist and nxt not in blocked and _passable(worldmap, *nxt):
+                dist[nxt] = d
+                queue.append(nxt)
+    return dist
+
+def disjoint_routes(worldmap, sources, target, limit=MAX_ROUTES):
+    """
+    Number of routes from any source tile to the target that share no tile
+    (vertex-disjoint paths, found as a unit-capacity max flow with every tile
+    split into an entry and an exit node). One route means that a single
+    chokepoint cuts the target off. Counting stops at `limit`.
+    """
+    capacity = defaultdict(int)
+    graph = defaultdict(list)
+
+    def add_edge(u, v):
+        capacity[(u, v)] += 1
+        graph[u].append(v)
+        graph[v].append(u) # residual edge
+
+    for y, row in enumerate(worldmap):
+        for x in range(len(row)):
+            if not _passable(worldmap, x, y):
+                continue
+            tile = (x, y)
+            add_edge((tile, "in"), (tile, "out"))
+            for n in _adjacent(worldmap, tile):
+                add_edge((tile, "out"), (n, "in"))
+    for s in sources:
+        add_edge("source", (s, "in"))
+    sink = (target, "in")
+
+    routes = 0
+    while routes < limit:
+        prev = {"source": None}
+        queue = deque(["source"])
+        while queue and sink not in prev:
+            u = queue.popleft()
+            for v in graph[u]:
+                if v not in prev and capacity[(u, v)] > 0:
+                    prev[v] = u
+                    queue.append(v)
+        if sink not in prev:
+            break
+        v = sink
+        while prev[v] is not None:
+            u = prev[v]
+            capacity[(u, v)] -= 1
+            capacity[(v, u)] += 1
+            v = u
+        routes += 1
+    return routes
+
+def _adjacent(worldmap, tile):
+    x, y = tile
+    return [(x + dx, y + dy) for dx, dy in DIRECTIONS if _passable(worldmap, x + dx, y + dy)]
+
+def heal_zone_exposure(worldmap, flag_pos, heal_range):
+    """Tiles outside the heal zone from which a straight shot reaches into it."""
+    fx, fy = flag_pos
+    zone = {(x, y) for x in range(fx - heal_range, fx + heal_range + 1)
+            for y in range(fy - heal_range, fy + heal_range + 1)
+            if abs(x - fx) + abs(y - fy) <= heal_range and _passable(worldmap, x, y)}
+    exposed = set()
+    for x, y in zone:
+        for dx, dy in DIRECTIONS:
+            sx, sy = x + dx, y + dy
+            while _passable(worldmap, sx, sy):
+                if (sx, sy) not in zone:
+                    exposed.add((sx, sy))
+                sx, sy = sx + dx, sy + dy
+    return len(exposed)
+
+def _asymmetry(a, b):
+    return abs(a - b) / (a + b) if a + b else 0.0
+
+def analyze_map(worldmap, blue_flag, red_flag, blue_spawns, red_spawns, config=None):
+    """Returns a dict with per-side measurements and the combined fairness score."""
+    config = GameConfig() if config is None else config
+    width = len(worldmap[0])
+    centre = [(width // 2, y) for y in range(len(worldmap)) if _passable(worldmap, width // 2, y)]
+
+    report = {}
+    for color, own_flag, enemy_flag, spawns in (("blue", blue_flag, red_flag, blue_spawns),
+                                                ("red", red_flag, blue_flag, red_spawns)):
+        # Agents cannot walk through their own flag
+        dist = bfs_distances(worldmap, enemy_flag, blocked={own_flag})
+        attack = [dist[s] for s in spawns if s in dist]
+        report[color] = {
+            # mean walk from this team's spawns to the enemy flag
+            "attack_distance": sum(attack) / len(attack) if len(attack) == len(spawns) and spawns else None,
+            # how many independent routes lead from the centre to this team's flag
+            "routes_to_flag": disjoint_routes(worldmap, set(centre) - {own_flag}, own_flag),
+            "heal_zone_exposure": heal_zone_exposure(worldmap, own_flag, config.heal_resupply_range),
+        }
+
+    blue, red = report["blue"], report["red"]
+    if None in (blue["attack_distance"], red["attack_distance"]) \
+            or blue["routes_to_flag"] == 0 or red["routes_to_flag"] == 0:
+        report["score"] = 0.0
+        return report
+
+    # Each term is 0 for identical sides and approaches 1 for very different ones
+    penalty = (
+        0.5 * _asymmetry(blue["attack_distance"], red["attack_distance"])
+        + 0.3 * _asymmetry(blue["routes_to_flag"], red["routes_to_flag"])
+        + 0.2 * _asymmetry(blue["heal_zone_exposure"], red["heal_zone_exposure"])
+    )
+    report["score"] = round(max(0.0, 1.0 - 2 * penalty), 3)
+    return report
+
+def analyze_world(world):
+    """Fairness report of a generated World."""
+    blue_spawns = [a.position for a in world.agents if a.color == "blue"]
+    red_spawns = [a.position for a in world.agents if a.color == "red"]
+    return analyze_map(world.worldmap, world.flags[0].spawn_position, world.flags[1].spawn_position,
+                       blue_spawns, red_spawns, world.config)
+
+class _MapOnlyAgent:
+    """Stand-in agent for generating maps without loading any team."""
+    def __init__(self, color, index):
+        pass
+
+def map_fairness(seed, config=None):
+    """Fairness report of the map that a match with this seed would be played on."""
+    from tournament import World
+    config = (GameConfig() if config is None else config).replace(min_map_fairness=0)
+    random.seed(seed)
+    world = World(config.height, config.width, 0, _MapOnlyAgent, _MapOnlyAgent, headless=True, config=config)
+    world.generate_world()
+    return analyze_world(world)
+
+def fair_seeds(count, min_score, first_seed=0, config=None, max_seed=None):
+    """
+    The first `count` seeds from first_seed on whose maps score at least
+    min_score. Seeds from max_seed on are not tried, so fewer may be returned.
+    """
+    seeds = []
+    seed = first_seed
+    while len(seeds) < count and (max_seed is None or seed < max_seed):
+        if map_fairness(seed, config)["score"] >= min_score:
+            seeds.append(seed)
+        seed += 1
+    return seeds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Map fairness analysis")
+    parser.add_argument("--seeds", default="0-19", help="Seeds to analyze, e.g. 0-99")
+    parser.add_argument("--count", type=int, default=None, help="Instead, list this many seeds with fair maps")
+    parser.add_argument("--min", type=float, default=0.8, help="Minimum score for --count")
+    args = parser.parse_args()
+
+    if args.count:
+        seeds = fair_seeds(args.count, args.min, max_seed=args.count * SEEDS_PER_FAIR_SEED)
+        print(" ".join(str(s) for s in seeds))
+        if len(seeds) < args.count:
+            print(f"Only {len(seeds)} of the first {args.count * SEEDS_PER_FAIR_SEED} seeds have a score of at least {args.min}")
+            sys.exit(1)
+    else:
+        first, _, last = args.seeds.partition("-")
+        for seed in range(int(first), int(last or first) + 1):
+            r = map_fairness(seed)
+            attack = [r[c]["attack_distance"] for c in ("blue", "red")]
+            print(f"seed {seed:>5}: score {r['score']:.3f}  "
+                  f"attack {' / '.join('-' if a is None else f'{a:.1f}' for a in attack)}  "
+                  f"routes {r['blue']['routes_to_flag']}/{r['red']['routes_to_flag']}  "
+                  f"exposure {r['blue']['heal_zone_exposure']}/{r['red']['heal_zone_exposure']}")
@@ -0,0 +1,109 @@
+"""
+Hot-reload of agent code while watching a match (python main.py ... --watch).
+
+The team folders are polled for changed .py files. When one changes, the team's
+agent.py is loaded again and the Agent instances are replaced before the next
+agent frame, so edits show up without restarting the game or losing the map.
+If the new code fails to load, the error is printed and the old code keeps
+playing.
+
+With keyframes, the game state is saved every few hundred ticks, and a reload
+can rewind to the last keyframe to retry the same situation with the new code.
+"""
+
+import os
+import time
+import traceback
+from collections import deque
+from match import load_agent_class
+
+class TeamWatcher:
+    """Notices changes to the .py files in a team folder."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.mtimes = self._scan()
+
+    def _scan(self):
+        mtimes = {}
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            for name in files:
+                if name.endswith(".py"):
+                    path = os.path.join(root, name)
+                    try:
+                        mtimes[path] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        pass # deleted while scanning
+        return mtimes
+
+    def changed(self):
+        mtimes = self._scan()
+        if mtimes == self.mtimes:
+            return False
+        self.mtimes = mtimes
+        return True
+
+
+class HotReloader:
+    """
+    Call before_step() before every world.step(). Checks the team folders at
+    most every poll_interval seconds and swaps in reloaded agents.
+    """
+
+    def __init__(self, world, blue_team_folder, red_team_folder, keep_knowledge=True,
+                 keyframe_every=None, rewind=False, poll_interval=0.5):
+        self.world = world
+        self.keep_knowledge = keep_knowledge
+        self.rewind = rewind
+        self.poll_interval = poll_interval
+        self.next_poll = 0
+
+        # The same folder can play both colours
+        self.watchers = {}
+        for color, folder in (("blue", blue_team_folder), ("red", red_team_folder)):
+            folder = os.path.abspath(folder)
+            if folder not in self.watchers:
+                self.watchers[folder] = (TeamWatcher(folder), [])
+            self.watchers[folder][1].append(color)
+
+        self.keyframe_every = keyframe_every
+        self.keyframes = deque(maxlen=10)
+        if keyframe_every:
+            self.keyframes.append(world.snapshot())
+
+    def before_step(self):
+        world = self.world
+        if self.keyframe_every and world.tick > self.keyframes[-1]["tick"] \
+                and world.tick % self.keyframe_every == 0:
+            self.keyframes.append(world.snapshot())
+
+        now = time.monotonic()
+        if now < self.next_poll:
+            return
+        self.next_poll = now + self.poll_interval
+
+        reloaded = []
+        for folder, (watcher, colors) in self.watchers.items():
+            if watcher.changed() and self._reload(folder, colors):
+                reloaded.extend(colors)
+        if reloaded and self.rewind and self.keyframes:
+            keyframe = self.keyframes[-1]
+            # The keyframe's knowledge comes back with it; reloaded teams that
+            # start over lose it again
+            world.restore(keyframe)
+            if not self.keep_knowledge:
+                for color in reloaded:
+                    (world.blue_shared_knowledge if color == "blue" else world.red_shared_knowledge).clear()
+            print(f"Rewound to tick {keyframe['tick']}")
+
+    def _reload(self, folder, colors):
+        try:
+            agent_class = load_agent_class(folder)
+            for color in colors:
+                self.world.swap_agent_class(color, agent_class, self.keep_knowledge)
+        except Exception:
+            print(f"Reloading {folder} failed, keeping the old code:\n{traceback.format_exc(limit=-3)}")
+            return False
+        print(f"Reloaded {folder} at tick {self.world.tick} ({' and '.join(colors)})")
+        return True
@@ -4,24 +4,19 @@
 Description of the agent (approach / strategy / implementation) in short points.
 This agent file creates a hybrid team: one human-controlled agent and two AI agents.
 - The Agent with index 0 on a team is designated as the player.
-- The player agent directly reads keyboard input using Pygame for real-time control:
+- The player agent is controlled with the keyboard:
     - WASD keys for movement.
     - Arrow keys for shooting.
+  Key presses are collected by main.py on every tick (see player_input.py), so
+  short taps between agent frames are not lost.
 - All other agents (index > 0) fall back to a simple random AI logic.
 - This setup is for testing and debugging, and requires the game to be run with 
-  the GUI enabled (not in --headless mode).
+  the GUI enabled (in --headless mode the player just stands still).
 """
 
 from config import *
 import random
-
-try:
-    # Pygame is used to get keyboard input for the human player.
-    # This will only work if the game is run in graphical mode.
-    import pygame
-except ImportError:
-    print("Warning: Pygame not found. Human-controlled agent will not work.")
-    pygame = None
+import player_input
 
 class Agent:
     
@@ -31,6 +26,8 @@ class Agent:
         
         # Agent with index 0 is designated as the player.
         self.is_player_controlled = (self.index == 0)
+        if self.is_player_controlled:
+            self.player_input = player_input.register(self.color)
 
         # --- Universal Agent Logic Setup (for the two AI agents) ---
         # Set team-specific goals and identifiers based on the agent's color.
@@ -44,37 +41,10 @@ class Agent:
 
     def _get_player_action(self):
         """
-        Reads the keyboard state using Pygame and returns the corresponding
-        action and direction for the human-controlled agent.
+        Returns the action and direction for the human-controlled agent from
+        the keys pressed since the last agent frame (collected by main.py).
         """
-        if not pygame:
-            return "", "" # Do nothing if pygame is not available.
-
-        keys = pygame.key.get_pressed()
-        action = ""
-        direction = ""
-
-        # Shooting has priority over movement. Arrow keys for shooting.
-        if keys[pygame.K_UP]:
-            action, direction = "shoot", "up"
-        elif keys[pygame.K_DOWN]:
-            action, direction = "shoot", "down"
-        elif keys[pygame.K_LEFT]:
-            action, direction = "shoot", "left"
-        elif keys[pygame.K_RIGHT]:
-            action, direction = "shoot", "right"
-        
-        # WASD for movement.
-        elif keys[pygame.K_w]:
-            action, direction = "move", "up"
-        elif keys[pygame.K_s]:
-            action, direction = "move", "down"
-        elif keys[pygame.K_a]:
-            action, direction = "move", "left"
-        elif keys[pygame.K_d]:
-            action, direction = "move", "right"
-
-        return action, direction
+        return self.player_input.next_action()
     
     def _get_ai_action(self, holding_flag, can_shoot, hp, ammo):
         """
@@ -1,19 +1,15 @@
 import sys
+import json
 import argparse
-import importlib
-import os
 import pygame
 from tournament import World
+from match import load_agent_class, log_match_result
+from memprofile import MemoryProfiler
+from render import ReplayWriter
+from hotreload import HotReloader
+import player_input
 from config import *
 
-def log_match_result(blue_agent_name, red_agent_name, winner, reason):
-    """Appends the result of a match to results.csv."""
-    try:
-        with open("results.csv", "a") as f:
-            f.write(f"{blue_agent_name},{red_agent_name},{winner},{reason}\n")
-    except IOError as e:
-        print(f"Error writing to log file: {e}")
-
 def setup_sprites():
     """Loads all sprites from files and returns a dictionary mapping tiles to surfaces."""
     sprites = {
@@ -29,13 +25,16 @@ def setup_sprites():
     return sprites
 
 def handle_pygame_events():
-    """Handles user input, like closing the window."""
+    """Handles user input, like closing the window, and passes keys on to human players."""
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             return False
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 return False
+            player_input.dispatch_key(pygame.key.name(event.key), down=True)
+        elif event.type == pygame.KEYUP:
+            player_input.dispatch_key(pygame.key.name(event.key), down=False)
     return True
 
 def render_world(world, screen, sprite_group, sprites):
@@ -54,30 +53,9 @@ def render_world(world, screen, sprite_group, sprites):
     sprite_group.draw(screen)
     pygame.display.flip()
 
-def load_agent_class(folder_path):
-    """Dynamically loads the Agent class from the 'agent.py' file within a given folder."""
-    if not os.path.isdir(folder_path):
-        raise FileNotFoundError(f"Agent folder not found: {folder_path}")
-    
-    main_agent_file = os.path.join(folder_path, 'agent.py')
-    if not os.path.isfile(main_agent_file):
-        raise FileNotFoundError(f"Required 'agent.py' not found in folder: {folder_path}")
-
-    # Temporarily add folder to Python path to handle local imports within the agent code
-    sys.path.insert(0, os.path.abspath(folder_path))
-    try:
-        # The module name is 'agent' because the file is agent.py
-        agent_module = importlib.import_module('agent')
-        # Ensure the module is fresh if it was loaded before
-        importlib.reload(agent_module) 
-        agent_class = agent_module.Agent
-    finally:
-        # Clean up the path
-        sys.path.pop(0)
-    
-    return agent_class
-
 def main(args):
+    player_input.policy = args.input_policy
+
     # Dynamically import agent classes from folders
     try:
         blue_agent_class = load_agent_class(args.blue_team_folder)
@@ -86,28 +64,53 @@ def main(args):
         print(f"Error loading agent: {e}")
         sys.exit(1)
 
+    try:
+        config = GameConfig.from_rules(json.loads(args.rules) if args.rules else None)
+    except ValueError as e:
+        print(f"Invalid rules: {e}")
+        sys.exit(1)
+
     # Pygame setup for graphical mode
     if not args.headless:
         pygame.init()
-        screen = pygame.display.set_mode((WIDTH*32, HEIGHT*32))
+        screen = pygame.display.set_mode((config.width*32, config.height*32))
         sprite_group = pygame.sprite.Group()
         sprites = setup_sprites()
         running = True
     
     # World setup
-    world = World(HEIGHT, WIDTH, TICK_RATE, blue_agent_class, red_agent_class, headless=args.headless, ascii_mode=args.ascii)
-    world.generate_world()
+    world = World(config.height, config.width, config.tick_rate, blue_agent_class, red_agent_class, headless=args.headless, ascii_mode=args.ascii, config=config)
+    try:
+        world.generate_world()
+    except ValueError as e:
+        print(f"Invalid rules: {e}")
+        sys.exit(1)
 
-    while not world.win:
-        world.check_win_state()
-        world.buffer_worldmap()
+    profiler = None
+    if args.memprofile or args.knowledge_cap is not None:
+        profiler = MemoryProfiler(trace=args.memprofile, knowledge_cap=args.knowledge_cap,
+                                  sample_interval=args.memprofile_interval,
+                                  team_folders=(args.blue_team_folder, args.red_team_folder))
+        profiler.start()
 
-        if world.tick % AGENT_UPDATE_INTERVAL == 0:
-            world.update_agents()
-        if (world.tick + 1) % BULLET_UPDATE_INTERVAL == 0:
-            world.update_bullets()
-            
-        world.iter()
+    replay = None
+    if args.record:
+        replay = ReplayWriter(args.record, world, args.blue_team_folder, args.red_team_folder)
+
+    reloader = None
+    if args.watch:
+        reloader = HotReloader(world, args.blue_team_folder, args.red_team_folder,
+                               keep_knowledge=not args.reset_knowledge,
+                               keyframe_every=args.keyframe_every, rewind=args.rewind)
+
+    while not world.win:
+        if reloader:
+            reloader.before_step()
+        agent_frame = world.step()
+        if agent_frame and profiler:
+            profiler.on_agent_frame(world)
+        if replay:
+            replay.capture(world)
 
         if args.ascii:
             world.ascii_display()
@@ -119,6 +122,11 @@ def main(args):
                 break
     
     world.terminate_agents()
+    if replay:
+        replay.close(world)
+
+    if profiler:
+        profiler.print_report(profiler.stop())
     
     winner, reason = world.win
     if winner == "tied":
@@ -138,5 +146,15 @@ if __name__ == "__main__":
     parser.add_argument("red_team_folder", help="Path to the folder containing the red team's agent.py")
     parser.add_argument("--headless", "-H", action="store_true", help="Run simulation without GUI for faster execution")
     parser.add_argument("--ascii", "-A", action="store_true", help="Display ASCII rendering in the console")
+    parser.add_argument("--memprofile", "-M", action="store_true", help="Trace memory use and report shared_knowledge growth, peak RSS and top engine allocation sites")
+    parser.add_argument("--memprofile-interval", type=int, default=10, help="Sample memory, and check --knowledge-cap, every N agent frames (default: 10)")
+    parser.add_argument("--knowledge-cap", type=int, default=None, metavar="BYTES", help="Forfeit a team whose shared_knowledge grows past this many bytes")
+    parser.add_argument("--rules", default=None, help='Override settings from config.py as JSON, e.g. \'{"WIDTH": 64, "HEIGHT": 48, "TEAM_SIZE": 5}\'')
+    parser.add_argument("--record", default=None, metavar="PATH", help="Save a replay of the match (see render.py)")
+    parser.add_argument("--input-policy", choices=player_input.POLICIES, default="last", help="Key presses between agent frames: 'last' keeps the latest, 'fifo' plays them in order (default: last)")
+    parser.add_argument("--watch", "-W", action="store_true", help="Reload agent code when files in the team folders change")
+    parser.add_argument("--reset-knowledge", action="store_true", help="With --watch, clear the team's shared_knowledge on reload")
+    parser.add_argument("--keyframe-every", type=int, default=200, metavar="TICKS", help="With --watch, save the game state this often (default: 200)")
+    parser.add_argument("--rewind", action="store_true", help="With --watch, go back to the last keyframe after a reload")
     args = parser.parse_args()
     main(args)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import os
+import json
+import itertools
+
+def job_key(blue_team, red_team, seed):
+    """Jobs are identified by their pairing, colours and seed."""
+    return f"{blue_team}|{red_team}|{seed}"
+
+def make_jobs(teams, games, first_seed=0, both_colours=True, seeds=None):
+    """
+    Match jobs for a batch (two teams) or a round-robin tournament (more teams).
+    Every pairing plays the same seeds (the given ones, or `games` seeds from
+    first_seed on), so the maps are the same for everyone.
+    """
+    if seeds is None:
+        seeds = range(first_seed, first_seed + games)
+    jobs = []
+    for team_a, team_b in itertools.combinations(teams, 2):
+        colourings = [(team_a, team_b), (team_b, team_a)] if both_colours else [(team_a, team_b)]
+        for blue, red in colourings:
+            for seed in seeds:
+                jobs.append({"key": job_key(blue, red, seed), "blue_team": blue, "red_team": red, "seed": seed})
+    return jobs
+
+class JobManifest:
+    """
+    Persistent record of the jobs of a long evaluation.
+
+    The manifest is an append-only journal (one JSON object per line). Every
+    state change is a single line written and flushed to disk, so a crash can
+    at worst lose a partially written last line, which is ignored when loading.
+    Jobs that were running when the previous run stopped are simply run again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs = {}     # key -> job
+        self.status = {}   # key -> "pending" / "running" / "done" / "failed"
+        self.results = {}  # key -> result of a finished job
+        if os.path.isfile(path):
+            self._load()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a")
+
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # torn write from a crash
+                key = entry["key"]
+                if "job" in entry:
+                    self.jobs[key] = entry["job"]
+                    self.status.setdefault(key, "pending")
+                if "status" in entry:
+                    self.status[key] = entry["status"]
+                if "result" in entry:
+                    self.results[key] = entry["result"]
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def add_jobs(self, jobs):
+        """Adds jobs that are not in the manifest yet. Returns how many were new."""
+        new = 0
+        for job in jobs:
+            if job["key"] in self.jobs:
+                continue
+            self.jobs[job["key"]] = job
+            self.status[job["key"]] = "pending"
+            self._append({"key": job["key"], "job": job})
+            new += 1
+        return new
+
+    def _keys(self, keys):
+        return self.jobs.keys() if keys is None else keys
+
+    def todo(self, keys=None):
+        """
+        Jobs that still have to run: pending, failed, or in flight when the last
+        run stopped. Only the jobs with the given keys are considered, if any.
+        """
+        return [self.jobs[key] for key in self._keys(keys) if self.status[key] != "done"]
+
+    def mark_running(self, key):
+        self.status[key] = "running"
+        self._append({"key": key, "status": "running"})
+
+    def mark_done(self, key, result):
+        self.status[key] = "done"
+        self.results[key] = result
+        self._append({"key": key, "status": "done", "result": result})
+
+    def mark_pending(self, key):
+        """Queues a job again, e.g. a finished one whose result is out of date."""
+        self.status[key] = "pending"
+        self._append({"key": key, "status": "pending"})
+
+    def mark_failed(self, key, error):
+        self.status[key] = "failed"
+        self._append({"key": key, "status": "failed", "error": error})
+
+    def counts(self, keys=None):
+        counts = {"pending": 0, "running": 0, "done": 0, "failed": 0}
+        for key in self._keys(keys):
+            counts[self.status[key]] += 1
+        return counts
+
+    def write_results_csv(self, path="results.csv", keys=None):
+        """Rewrites the results file from the finished jobs (all, or those with the given keys), in job order."""
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("blue_team,red_team,winner,reason\n")
+            for key in self._keys(keys):
+                if self.status[key] == "done":
+                    job, result = self.jobs[key], self.results[key]
+                    f.write(f"{job['blue_team']},{job['red_team']},{result['winner']},{result['reason']}\n")
+        os.replace(tmp, path)
+
+    def close(self):
+        self.file.close()
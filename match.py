@@ -0,0 +1,117 @@
+import os
+import sys
+import hashlib
+import random
+import importlib.util
+from tournament import World
+from config import *
+
+def log_match_result(blue_agent_name, red_agent_name, winner, reason, path="results.csv"):
+    """Appends the result of a match to results.csv, starting a new file with the header."""
+    try:
+        new = not os.path.isfile(path) or os.path.getsize(path) == 0
+        with open(path, "a") as f:
+            if new:
+                f.write("blue_team,red_team,winner,reason\n")
+            f.write(f"{blue_agent_name},{red_agent_name},{winner},{reason}\n")
+    except IOError as e:
+        print(f"Error writing to log file: {e}")
+
+def _forget_team_modules(folder_path):
+    """Drops helper modules imported from a team folder so other teams don't pick them up."""
+    folder_path = os.path.join(folder_path, "")
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if module_file and os.path.abspath(module_file).startswith(folder_path):
+            del sys.modules[name]
+
+def load_agent_module(folder_path):
+    """Dynamically loads the 'agent.py' file within a given folder as a new module."""
+    if not os.path.isdir(folder_path):
+        raise FileNotFoundError(f"Agent folder not found: {folder_path}")
+
+    main_agent_file = os.path.join(folder_path, 'agent.py')
+    if not os.path.isfile(main_agent_file):
+        raise FileNotFoundError(f"Required 'agent.py' not found in folder: {folder_path}")
+
+    # Every team gets its own module, so loading a second team (or the same team
+    # again) never overwrites the globals of an Agent class that is already in use.
+    folder_path = os.path.abspath(folder_path)
+    module_name = "agent_" + hashlib.sha1(folder_path.encode()).hexdigest()[:12]
+    spec = importlib.util.spec_from_file_location(module_name, main_agent_file)
+    agent_module = importlib.util.module_from_spec(spec)
+
+    # Temporarily add folder to Python path to handle local imports within the agent code
+    _forget_team_modules(folder_path)
+    sys.path.insert(0, folder_path)
+    try:
+        spec.loader.exec_module(agent_module)
+    finally:
+        # Clean up the path
+        sys.path.pop(0)
+        _forget_team_modules(folder_path)
+
+    return agent_module
+
+def load_agent_class(folder_path, params=None):
+    """
+    Dynamically loads the Agent class from the 'agent.py' file within a given folder.
+    `params` override entries of the module-level PARAMS dict that teams can
+    use for their tunable constants (see tune.py).
+    """
+    agent_module = load_agent_module(folder_path)
+    if params:
+        team_params = getattr(agent_module, "PARAMS", None)
+        if not isinstance(team_params, dict):
+            raise ValueError(f"{folder_path}/agent.py has no PARAMS dict to override")
+        unknown = set(params) - set(team_params)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {folder_path}: {', '.join(sorted(unknown))}")
+        team_params.update(params)
+    return agent_module.Agent
+
+def run_match(blue_team_folder, red_team_folder, seed=None, rules=None, telemetry=None, config=None,
+              recorder=None, record_colors=("blue", "red"), blue_params=None, red_params=None):
+    """
+    Plays one headless match between two team folders and returns its result.
+    The rules are a GameConfig, or overrides of the settings in config.py such as
+    {"MAX_TICKS": 3000}. The same seed and rules always produce the same map
+    and, for deterministic agents, the same game.
+    If a telemetry.Telemetry is given, the match's events are added to it.
+    If a dataset.ShardWriter is given, the observations and actions of the
+    agents of record_colors are written to it.
+    blue_params and red_params override the teams' PARAMS (see load_agent_class).
+    """
+    if config is None:
+        config = GameConfig.from_rules(rules)
+
+    blue_agent_class = load_agent_class(blue_team_folder, blue_params)
+    red_agent_class = load_agent_class(red_team_folder, red_params)
+
+    if seed is not None:
+        random.seed(seed)
+
+    world = World(config.height, config.width, 0, blue_agent_class, red_agent_class, headless=True, config=config)
+    world.generate_world()
+    if telemetry:
+        world.attach_telemetry(telemetry, blue_team_folder, red_team_folder)
+    if recorder:
+        world.attach_recorder(recorder, record_colors, match_id=-1 if seed is None else seed)
+    while not world.win:
+        world.step()
+    world.terminate_agents()
+    if recorder:
+        recorder.end_match(world)
+
+    winner, reason = world.win
+    return {
+        "blue_team": blue_team_folder,
+        "red_team": red_team_folder,
+        "seed": seed,
+        "winner": winner,
+        "reason": reason,
+        "ticks": world.tick,
+        # Seconds spent in Agent.update and number of calls, per colour
+        "update_time": world.update_time,
+        "update_calls": world.update_calls,
+    }
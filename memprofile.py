@@ -0,0 +1,201 @@
+import os
+import sys
+import types
+import tracemalloc
+import tournament
+
+try:
+    # Not available on Windows; peak RSS is simply not reported there.
+    import resource
+except ImportError:
+    resource = None
+
+# Source files whose allocations are reported as "engine" allocation sites.
+ENGINE_DIR = os.path.dirname(os.path.abspath(tournament.__file__))
+ENGINE_FILES = (os.path.join(ENGINE_DIR, "tournament.py"), os.path.join(ENGINE_DIR, "main.py"))
+PROFILER_FILE = os.path.abspath(__file__)
+TRACE_FRAMES = 8
+
+
+# Shared by every object that refers to them, so never counted as part of one
+_NOT_OWNED = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType,
+              types.MethodType, types.CodeType, types.FrameType)
+
+def deep_sizeof(obj):
+    """
+    Approximate size in bytes of an object and everything reachable from it.
+    Modules, classes and functions are skipped. The walk uses its own stack, so
+    deeply nested structures (e.g. long linked lists) cannot hit the recursion limit.
+    """
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _NOT_OWNED):
+            continue
+        seen.add(id(obj))
+
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+    return size
+
+
+def peak_rss_kb():
+    """Returns the peak resident set size of this process in kB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class MemoryProfiler:
+    """
+    Samples memory use at agent frames.
+
+    Tracks the size of each team's shared_knowledge over time and, if tracing is
+    enabled, the traced heap size and the top allocation sites in the engine.
+    Each allocation belongs to the innermost frame of its traceback that is
+    not in a library: engine lines are reported as sites, allocations made by
+    code in a team folder are summed up per team, and the profiler's own
+    allocations are left out.
+    If knowledge_cap (bytes) is set, a team whose shared_knowledge grows past it
+    forfeits the match. Sizes are only measured every sample_interval agent
+    frames, for the cap as well, since walking large knowledge is slow.
+    """
+
+    def __init__(self, trace=True, knowledge_cap=None, sample_interval=1, top_sites=10, team_folders=()):
+        self.trace = trace
+        self.knowledge_cap = knowledge_cap
+        self.sample_interval = max(1, sample_interval)
+        self.top_sites = top_sites
+
+        self.frames = 0
+        self.samples = [] # (tick, blue_bytes, red_bytes, traced_bytes)
+        self.peak_knowledge = {"blue": 0, "red": 0}
+        self.forfeited = []
+        self.sites = {} # "file:line" -> [summed bytes, summed blocks] over samples
+        self.team_folders = {os.path.join(os.path.abspath(folder), ""): folder for folder in team_folders}
+        self.agent_allocations = {folder: [0, 0] for folder in self.team_folders.values()} # same, per team
+
+    def start(self):
+        if self.trace and not tracemalloc.is_tracing():
+            # A few frames deep so allocations made by helpers (e.g. copy.deepcopy)
+            # are attributed to the engine line that called them.
+            tracemalloc.start(TRACE_FRAMES)
+
+    def on_agent_frame(self, world):
+        """Called right after world.update_agents()."""
+        sample = self.frames % self.sample_interval == 0
+        self.frames += 1
+        if not sample:
+            return
+
+        sizes = {
+            "blue": deep_sizeof(world.blue_shared_knowledge),
+            "red": deep_sizeof(world.red_shared_knowledge),
+        }
+        for color, size in sizes.items():
+            self.peak_knowledge[color] = max(self.peak_knowledge[color], size)
+
+        traced = None
+        if self.trace:
+            traced = tracemalloc.get_traced_memory()[0]
+            self._sample_engine_sites()
+        self.samples.append((world.tick, sizes["blue"], sizes["red"], traced))
+
+        if self.knowledge_cap is not None and not world.win:
+            self.forfeited = [color for color, size in sizes.items() if size > self.knowledge_cap]
+            if len(self.forfeited) == 2:
+                world.win = ("tied", "knowledge_cap")
+            elif self.forfeited == ["blue"]:
+                world.win = ("red", "knowledge_cap")
+            elif self.forfeited == ["red"]:
+                world.win = ("blue", "knowledge_cap")
+
+    def _owner(self, traceback):
+        """"engine", a team folder or None (profiler or library only) for an allocation's traceback."""
+        for frame in reversed(traceback): # innermost frame first
+            filename = frame.filename
+            if filename == PROFILER_FILE:
+                return None
+            if filename in ENGINE_FILES:
+                return "engine"
+            for prefix, folder in self.team_folders.items():
+                if filename.startswith(prefix):
+                    return folder
+        return None
+
+    def _sample_engine_sites(self):
+        snapshot = tracemalloc.take_snapshot()
+        for stat in snapshot.statistics("traceback"):
+            owner = self._owner(stat.traceback)
+            if owner is None:
+                continue
+            if owner == "engine":
+                # Innermost engine frame, so helpers (e.g. copy.deepcopy) count for the line that called them
+                frame = next(f for f in reversed(stat.traceback) if f.filename in ENGINE_FILES)
+                totals = self.sites.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+            else:
+                totals = self.agent_allocations[owner]
+            totals[0] += stat.size
+            totals[1] += stat.count
+
+    def stop(self):
+        """Stops tracing and returns a summary dictionary of the match."""
+        report = {
+            "agent_frames": self.frames,
+            "samples": self.samples,
+            "peak_knowledge_bytes": dict(self.peak_knowledge),
+            "forfeited": list(self.forfeited),
+            "peak_rss_kb": peak_rss_kb(),
+            "peak_traced_bytes": None,
+            "top_sites": [],
+            "agent_allocations": [],
+        }
+        if self.trace and tracemalloc.is_tracing():
+            report["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            # Average live bytes/blocks per engine source line across all samples
+            n = max(1, len(self.samples))
+            ranked = sorted(self.sites.items(), key=lambda item: item[1][0], reverse=True)
+            for site, (size, count) in ranked[:self.top_sites]:
+                report["top_sites"].append((site, size // n, count // n))
+            for folder, (size, count) in self.agent_allocations.items():
+                report["agent_allocations"].append((folder, size // n, count // n))
+        return report
+
+    def print_report(self, report):
+        print("=== MEMORY PROFILE ===")
+        print(f"Agent frames:        {report['agent_frames']}")
+        if report["peak_rss_kb"] is not None:
+            print(f"Peak RSS:            {report['peak_rss_kb']} kB")
+        if report["peak_traced_bytes"] is not None:
+            print(f"Peak traced memory:  {report['peak_traced_bytes']} B")
+        for color in ("blue", "red"):
+            print(f"{color} shared_knowledge peak: {report['peak_knowledge_bytes'][color]} B")
+        if report["forfeited"]:
+            print(f"Over knowledge cap:  {', '.join(report['forfeited'])}")
+
+        if report["samples"]:
+            print("\n--- shared_knowledge growth (tick, blue B, red B) ---")
+            step = max(1, len(report["samples"]) // 10)
+            for tick, blue, red, _ in report["samples"][::step]:
+                print(f"{tick:>6} {blue:>10} {red:>10}")
+
+        if report["top_sites"]:
+            print("\n--- top engine allocation sites (average live) ---")
+            for site, size, count in report["top_sites"]:
+                print(f"{size:>10} B {count:>7} blocks  {site}")
+
+        if report["agent_allocations"]:
+            print("\n--- allocations by agent code (average live) ---")
+            for folder, size, count in report["agent_allocations"]:
+                print(f"{size:>10} B {count:>7} blocks  {folder}")
@@ -0,0 +1,254 @@
+"""
+Watch many matches at once: live matches or replays, tiled into one window.
+
+Worker processes play the matches (or read the replays) and send the world as
+one small byte string every few ticks through a queue. If the viewer falls
+behind, frames are dropped instead of slowing the workers down. Each match is
+drawn into its own small surface: walls are drawn once per map, and only tiles
+that changed since the previous frame are redrawn, from sprites scaled once.
+
+Usage:
+    python mosaic.py match blu red --slots 12 --workers 4
+    python mosaic.py match blu red --slots 9 --tick-rate 0 --every 20    # full speed, sampled
+    python mosaic.py replay replays/*.replay --fps 20
+
+Close the window or press Escape to stop.
+"""
+
+import os
+import math
+import time
+import queue
+import random
+import json
+import argparse
+import multiprocessing
+from config import *
+
+# ---------- Worker processes ----------
+def _send(frames, message):
+    try:
+        frames.put_nowait(message)
+    except queue.Full:
+        pass # the viewer is behind; it will get a later frame
+
+def _world_message(slot, label, world):
+    rows = "".join("".join(row) for row in world.worldmap_buffer).encode("ascii")
+    return (slot, label, world.tick, world.width, world.height, rows, world.win)
+
+def play_slots(slots, blue_team, red_team, first_seed, total_slots, every, tick_rate, rules, frames, stop):
+    """Plays matches side by side, one per slot; a finished match is followed by the next seed."""
+    from match import load_agent_class
+    from tournament import World
+
+    config = GameConfig.from_rules(rules)
+    blue_class, red_class = load_agent_class(blue_team), load_agent_class(red_team)
+    games = {}
+
+    # Matches are stepped in turn, but each keeps its own state of the global
+    # random generator (which agents use), so a match plays out exactly as
+    # run_match(..., seed=seed) would on its own.
+    def start(slot, seed):
+        random.seed(seed)
+        world = World(config.height, config.width, 0, blue_class, red_class, headless=True, config=config)
+        world.generate_world()
+        label = (f"{os.path.basename(os.path.normpath(blue_team))} vs "
+                 f"{os.path.basename(os.path.normpath(red_team))} #{seed}")
+        games[slot] = [world, seed, label, random.getstate()]
+
+    for slot in slots:
+        start(slot, first_seed + slot)
+    while not stop.is_set():
+        tick_start = time.perf_counter()
+        for slot in slots:
+            game = games[slot]
+            world, seed, label, state = game
+            random.setstate(state)
+            world.step()
+            game[3] = random.getstate()
+            if world.win:
+                world.terminate_agents()
+                frames.put(_world_message(slot, label, world)) # results are never dropped
+                start(slot, seed + total_slots)
+            elif (world.tick - 1) % every == 0:
+                _send(frames, _world_message(slot, label, world))
+        if tick_rate:
+            time.sleep(max(0.0, tick_rate - (time.perf_counter() - tick_start)))
+
+def play_replays(slots, paths, every, fps, frames, stop):
+    """Streams replays at a fixed frame rate, one per slot."""
+    from render import read_replay
+
+    streams = {}
+    for slot, path in zip(slots, paths):
+        header, records = read_replay(path)
+        streams[slot] = (header, records, os.path.basename(path))
+    while streams and not stop.is_set():
+        frame_start = time.perf_counter()
+        for slot in list(streams):
+            header, records, label = streams[slot]
+            for _ in range(max(1, every // header.get("every", 1))):
+                record = next(records, None)
+            if record is None:
+                del streams[slot]
+                continue
+            tick, rows = record
+            _send(frames, (slot, label, tick, header["width"], header["height"], "".join(rows).encode("ascii"), None))
+        time.sleep(max(0.0, 1 / fps - (time.perf_counter() - frame_start)))
+
+# ---------- Viewer ----------
+class MatchTile:
+    """One match in the mosaic, drawn into its own surface."""
+
+    def __init__(self, pygame, sprites, tile_size):
+        self.pygame = pygame
+        self.sprites = sprites
+        self.tile_size = tile_size
+        self.label = None
+        self.rows = None
+        self.result = None
+        self.surface = None
+        self.background = None
+
+    def _start_map(self, width, height, rows):
+        pygame, size = self.pygame, self.tile_size
+        self.background = pygame.Surface((width * size, height * size))
+        self.background.fill((0, 0, 0))
+        wall = ord(ASCII_TILES["wall"])
+        for i, tile in enumerate(rows):
+            if tile == wall:
+                self.background.blit(self.sprites[wall], (i % width * size, i // width * size))
+        self.surface = self.background.copy()
+        self.rows = None
+
+    def show(self, label, width, height, rows, result):
+        """Draws a frame, redrawing only the tiles that changed."""
+        if label != self.label or self.surface is None or self.surface.get_width() != width * self.tile_size:
+            self.label = label
+            self._start_map(width, height, rows)
+        self.result = result
+        size, previous = self.tile_size, self.rows
+        for i, tile in enumerate(rows):
+            if previous is not None and previous[i] == tile:
+                continue
+            position = (i % width * size, i // width * size)
+            self.surface.blit(self.background, position, (position, (size, size)))
+            if tile in self.sprites and tile != ord(ASCII_TILES["wall"]):
+                self.surface.blit(self.sprites[tile], position)
+        self.rows = rows
+
+def run_viewer(frames, slots, tile_size, map_size, fps, is_done):
+    """Shows incoming frames until the window is closed (or is_done() and no frames are left)."""
+    import pygame
+    from main import setup_sprites
+
+    width, height = map_size
+    columns = math.ceil(math.sqrt(slots))
+    lines = math.ceil(slots / columns)
+    label_height = 16
+    cell = (width * tile_size + 4, height * tile_size + label_height + 4)
+
+    pygame.init()
+    screen = pygame.display.set_mode((columns * cell[0], lines * cell[1]))
+    font = pygame.font.Font(None, label_height + 2)
+    # Sprites are scaled once and shared by all tiles
+    sprites = {ord(tile): pygame.transform.smoothscale(image, (tile_size, tile_size))
+               for tile, image in setup_sprites().items()}
+    tiles = [MatchTile(pygame, sprites, tile_size) for _ in range(slots)]
+    results = {"blue": 0, "red": 0, "tied": 0}
+    clock = pygame.time.Clock()
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+
+        # Only the newest frame of each slot is drawn, older ones are skipped
+        latest = {}
+        while True:
+            try:
+                slot, label, tick, w, h, rows, win = frames.get_nowait()
+            except queue.Empty:
+                break
+            if win:
+                results[win[0]] += 1
+            latest[slot] = (label, tick, w, h, rows, win)
+        if not latest and is_done():
+            break
+
+        for slot, (label, tick, w, h, rows, win) in latest.items():
+            tiles[slot].show(label, w, h, rows, win)
+
+        screen.fill((20, 20, 20))
+        for slot, tile in enumerate(tiles):
+            if tile.surface is None:
+                continue
+            x, y = slot % columns * cell[0] + 2, slot // columns * cell[1] + 2
+            text = tile.label + (f": {tile.result[0]} ({tile.result[1]})" if tile.result else "")
+            screen.blit(font.render(text, True, (200, 200, 200)), (x, y))
+            screen.blit(tile.surface, (x, y + label_height))
+        pygame.display.set_caption(f"Mosaic - {sum(results.values())} finished: "
+                                   f"blue {results['blue']}, red {results['red']}, tied {results['tied']}")
+        pygame.display.flip()
+        clock.tick(fps)
+    pygame.quit()
+
+def main(args):
+    slots = args.slots if args.mode == "match" else len(args.replays)
+    # Bounded, so a slow viewer makes workers drop frames instead of piling them up
+    frames = multiprocessing.Queue(maxsize=4 * slots)
+    stop = multiprocessing.Event()
+
+    if args.mode == "match":
+        config = GameConfig.from_rules(json.loads(args.rules) if args.rules else None)
+        map_size = (config.width, config.height)
+        workers = [multiprocessing.Process(
+            target=play_slots, daemon=True,
+            args=(list(range(w, slots, args.workers)), args.blue_team_folder, args.red_team_folder,
+                  args.seed, slots, args.every, args.tick_rate, json.loads(args.rules) if args.rules else None,
+                  frames, stop))
+            for w in range(min(args.workers, slots))]
+    else:
+        from render import read_replay
+        # Cells fit the largest map, smaller ones leave a margin
+        headers = [read_replay(path)[0] for path in args.replays]
+        map_size = (max(header["width"] for header in headers), max(header["height"] for header in headers))
+        workers = [multiprocessing.Process(
+            target=play_replays, daemon=True,
+            args=(list(range(w, slots, args.workers)), args.replays[w::args.workers], args.every, args.fps, frames, stop))
+            for w in range(min(args.workers, slots))]
+
+    for worker in workers:
+        worker.start()
+    try:
+        run_viewer(frames, slots, args.tile_size, map_size, args.fps,
+                   is_done=lambda: not any(worker.is_alive() for worker in workers))
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch many matches or replays in one window")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p = sub.add_parser("match", help="Play and watch new matches")
+    p.add_argument("blue_team_folder")
+    p.add_argument("red_team_folder")
+    p.add_argument("--slots", type=int, default=9, help="Matches shown at once (default: 9)")
+    p.add_argument("--seed", type=int, default=0, help="Seed of the first match")
+    p.add_argument("--tick-rate", type=float, default=TICK_RATE, help="Seconds per tick, 0 for full speed")
+    p.add_argument("--rules", default=None, help='JSON overrides of config.py, e.g. \'{"MAX_TICKS": 3000}\'')
+
+    p = sub.add_parser("replay", help="Watch stored replays")
+    p.add_argument("replays", nargs="+", help="Replay files (one slot each)")
+
+    for p in sub.choices.values():
+        p.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+        p.add_argument("--every", type=int, default=AGENT_UPDATE_INTERVAL, help="Send every Nth tick")
+        p.add_argument("--tile-size", type=int, default=8, help="Tile size in pixels (default: 8)")
+        p.add_argument("--fps", type=int, default=20, help="Viewer (and replay) frame rate")
+    main(parser.parse_args())
@@ -0,0 +1,76 @@
+"""
+Keyboard input for human-controlled agents.
+
+main.py's event pump passes every key press and release to dispatch_key() on
+every tick, so short taps between agent frames are not lost. A human player
+agent registers an input queue for its team and calls next_action() in its
+update to get the action for that frame.
+
+Policies for presses that pile up between two agent frames:
+    "last"  only the most recent press counts, the others are dropped
+    "fifo"  presses are played in order, one per agent frame
+If nothing was pressed, keys that are still held down repeat their action.
+"""
+
+# Key names as reported by pygame.key.name(); shooting has priority over moving
+KEY_BINDINGS = {
+    "up": ("shoot", "up"),
+    "down": ("shoot", "down"),
+    "left": ("shoot", "left"),
+    "right": ("shoot", "right"),
+    "w": ("move", "up"),
+    "s": ("move", "down"),
+    "a": ("move", "left"),
+    "d": ("move", "right"),
+}
+POLICIES = ("last", "fifo")
+MAX_QUEUED = 8 # presses kept with the fifo policy
+
+policy = "last" # set by main.py --input-policy
+_queues = {}    # team colour -> PlayerInput
+
+class PlayerInput:
+
+    def __init__(self, policy="last"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown input policy '{policy}', expected one of {POLICIES}")
+        self.policy = policy
+        self.pressed = []
+        self.held = set()
+
+    def key_down(self, name):
+        if name in KEY_BINDINGS:
+            self.held.add(name)
+            self.pressed.append(name)
+            if len(self.pressed) > MAX_QUEUED:
+                del self.pressed[0]
+
+    def key_up(self, name):
+        self.held.discard(name)
+
+    def next_action(self):
+        """(action, direction) for this agent frame, or ("", "") to do nothing."""
+        if self.pressed:
+            if self.policy == "last":
+                name = self.pressed[-1]
+                self.pressed.clear()
+            else:
+                name = self.pressed.pop(0)
+            return KEY_BINDINGS[name]
+        for name, action in KEY_BINDINGS.items():
+            if name in self.held:
+                return action
+        return "", ""
+
+def register(color):
+    """Creates the input queue of a team's human player (replacing an older one)."""
+    _queues[color] = PlayerInput(policy)
+    return _queues[color]
+
+def dispatch_key(name, down=True):
+    """Passes a key press or release to every human player."""
+    for queue in _queues.values():
+        if down:
+            queue.key_down(name)
+        else:
+            queue.key_up(name)
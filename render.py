@@ -0,0 +1,246 @@
+"""
+Offscreen rendering of matches and replays to PNG frames or animated GIFs.
+
+Uses SDL's dummy video driver, so it runs on headless servers, and only draws
+every Nth tick, so it is much faster than watching the game in real time.
+Several matches can be rendered in parallel.
+
+Replays are JSON lines files: a header line with the match details, then one
+line per recorded tick with the rows of the world as strings. They are written
+by `python main.py ... --record game.replay` or by `render.py match --save-replay`.
+
+Usage:
+    python render.py match blu red --seed 3 --every 2 --out clip.gif
+    python render.py match blu red --seeds 0-9 --workers 4 --out clips/
+    python render.py replay game.replay --out frames/
+
+GIF output needs Pillow (pip install pillow). For MP4, render PNG frames and
+assemble them with e.g. ffmpeg -framerate 20 -i frames/%05d.png clip.mp4
+"""
+
+import os
+import json
+import random
+import argparse
+from multiprocessing import Pool
+from config import *
+
+TILE_SIZE = 32
+
+class ReplayWriter:
+    """Writes the world buffer of selected ticks to a replay file."""
+
+    def __init__(self, path, world, blue_team="blue", red_team="red", seed=None, every=1):
+        self.every = max(1, every)
+        self.file = open(path, "w")
+        header = {"height": world.height, "width": world.width,
+                  "blue_team": blue_team, "red_team": red_team, "seed": seed, "every": self.every}
+        self.file.write(json.dumps(header) + "\n")
+
+    def capture(self, world):
+        """Call after world.buffer_worldmap() (e.g. after world.step())."""
+        if world.worldmap_buffer is not None and world.tick % self.every == 0:
+            rows = ["".join(row) for row in world.worldmap_buffer]
+            self.file.write(json.dumps({"tick": world.tick, "rows": rows}) + "\n")
+
+    def close(self, world=None):
+        if world is not None and world.win:
+            self.file.write(json.dumps({"result": list(world.win)}) + "\n")
+        self.file.close()
+
+def read_replay(path):
+    """Returns (header, iterator over (tick, rows))."""
+    f = open(path)
+    header = json.loads(f.readline())
+
+    def frames():
+        with f:
+            for line in f:
+                record = json.loads(line)
+                if "rows" in record:
+                    yield record["tick"], record["rows"]
+    return header, frames()
+
+def match_frames(blue_team_folder, red_team_folder, seed=None, every=1, replay_path=None, config=None):
+    """Plays a headless match and yields (tick, rows) every `every` ticks."""
+    from match import load_agent_class
+    from tournament import World
+
+    blue_agent_class = load_agent_class(blue_team_folder)
+    red_agent_class = load_agent_class(red_team_folder)
+    if seed is not None:
+        random.seed(seed)
+    config = GameConfig() if config is None else config
+    world = World(config.height, config.width, 0, blue_agent_class, red_agent_class, headless=True, config=config)
+    world.generate_world()
+
+    replay = ReplayWriter(replay_path, world, blue_team_folder, red_team_folder, seed, every) if replay_path else None
+    while not world.win:
+        world.step()
+        if replay:
+            replay.capture(world)
+        # world.tick has already advanced past the buffered tick
+        if (world.tick - 1) % every == 0:
+            yield world.tick - 1, world.worldmap_buffer
+    world.terminate_agents()
+    if replay:
+        replay.close(world)
+
+
+class OffscreenRenderer:
+    """Draws world rows onto an offscreen surface using a prebuilt tile atlas."""
+
+    def __init__(self, tile_size=TILE_SIZE // 2):
+        # Must be set before pygame initialises its video system
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        import pygame
+        from main import setup_sprites
+
+        self.pygame = pygame
+        self.tile_size = tile_size
+        pygame.display.init()
+        pygame.display.set_mode((1, 1)) # needed for convert_alpha() in setup_sprites
+
+        # All sprites, scaled once, side by side in a single atlas surface
+        sprites = setup_sprites()
+        self.atlas = pygame.Surface((tile_size * len(sprites), tile_size), pygame.SRCALPHA)
+        self.atlas_rects = {}
+        for i, (tile, image) in enumerate(sprites.items()):
+            self.atlas.blit(pygame.transform.smoothscale(image, (tile_size, tile_size)), (i * tile_size, 0))
+            self.atlas_rects[tile] = pygame.Rect(i * tile_size, 0, tile_size, tile_size)
+
+        self.background = None
+        self.surface = None
+
+    def close(self):
+        self.pygame.quit()
+
+    def _build_background(self, rows):
+        # Walls never change during a game, so they are drawn once
+        pygame, size = self.pygame, self.tile_size
+        self.background = pygame.Surface((len(rows[0]) * size, len(rows) * size))
+        self.background.fill((0, 0, 0))
+        wall = self.atlas_rects[ASCII_TILES["wall"]]
+        for y, row in enumerate(rows):
+            for x, tile in enumerate(row):
+                if tile == ASCII_TILES["wall"]:
+                    self.background.blit(self.atlas, (x * size, y * size), wall)
+        self.surface = self.background.copy()
+
+    def draw(self, rows):
+        if self.background is None:
+            self._build_background(rows)
+        size = self.tile_size
+        self.surface.blit(self.background, (0, 0))
+        for y, row in enumerate(rows):
+            for x, tile in enumerate(row):
+                if tile != ASCII_TILES["empty"] and tile != ASCII_TILES["wall"] and tile in self.atlas_rects:
+                    self.surface.blit(self.atlas, (x * size, y * size), self.atlas_rects[tile])
+        return self.surface
+
+    def render(self, frames, out, fps=20):
+        """
+        Renders (tick, rows) frames. `out` ending in .gif writes an animated GIF,
+        anything else is a directory that receives numbered PNG files.
+        """
+        pygame = self.pygame
+        if out.lower().endswith(".gif"):
+            try:
+                from PIL import Image
+            except ImportError:
+                raise ImportError("GIF output needs Pillow (pip install pillow); use a directory for PNG frames")
+            images = []
+            for _, rows in frames:
+                surface = self.draw(rows)
+                images.append(Image.frombytes("RGB", surface.get_size(), pygame.image.tostring(surface, "RGB")))
+            if images:
+                images[0].save(out, save_all=True, append_images=images[1:],
+                               duration=int(1000 / fps), loop=0, optimize=False)
+            return len(images)
+
+        os.makedirs(out, exist_ok=True)
+        count = 0
+        for _, rows in frames:
+            pygame.image.save(self.draw(rows), os.path.join(out, f"{count:05d}.png"))
+            count += 1
+        return count
+
+
+def _parse_seeds(text):
+    """'3' -> [3], '0-9' -> [0..9], '1,5,7' -> [1, 5, 7]"""
+    seeds = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            seeds.extend(range(int(first), int(last) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+def _render_match(task):
+    blue, red, seed, every, out, tile_size, fps, replay_path = task
+    renderer = OffscreenRenderer(tile_size)
+    try:
+        count = renderer.render(match_frames(blue, red, seed, every, replay_path), out, fps)
+    finally:
+        # Worker processes do not exit cleanly while SDL is still initialised
+        renderer.close()
+    return out, count
+
+def main(args):
+    if args.mode == "replay":
+        header, frames = read_replay(args.replay)
+        every = max(1, args.every // header.get("every", 1))
+        frames = (frame for i, frame in enumerate(frames) if i % every == 0)
+        renderer = OffscreenRenderer(args.tile_size)
+        count = renderer.render(frames, args.out, args.fps)
+        renderer.close()
+        print(f"Rendered {count} frames to {args.out}")
+        return
+
+    seeds = _parse_seeds(args.seeds) if args.seeds else [args.seed]
+    tasks = []
+    for seed in seeds:
+        out, replay_path = args.out, args.save_replay
+        if len(seeds) > 1:
+            # One output (and replay) per match inside the given directory
+            name = f"{os.path.basename(os.path.normpath(args.blue_team_folder))}-" \
+                   f"{os.path.basename(os.path.normpath(args.red_team_folder))}-{seed}"
+            os.makedirs(args.out, exist_ok=True)
+            out = os.path.join(args.out, name + (".gif" if args.gif else ""))
+            if args.save_replay:
+                os.makedirs(args.save_replay, exist_ok=True)
+                replay_path = os.path.join(args.save_replay, name + ".replay")
+        tasks.append((args.blue_team_folder, args.red_team_folder, seed, args.every,
+                      out, args.tile_size, args.fps, replay_path))
+
+    if len(tasks) == 1:
+        results = [_render_match(tasks[0])]
+    else:
+        with Pool(args.workers) as pool:
+            results = pool.map(_render_match, tasks)
+    for out, count in results:
+        print(f"Rendered {count} frames to {out}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render matches or replays offscreen")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    p = sub.add_parser("match", help="Play and render a new match")
+    p.add_argument("blue_team_folder")
+    p.add_argument("red_team_folder")
+    p.add_argument("--seed", type=int, default=None, help="Map/game seed")
+    p.add_argument("--seeds", default=None, help="Render several matches, e.g. 0-9 or 1,4,7 (--out is a directory)")
+    p.add_argument("--gif", action="store_true", help="With --seeds, write one GIF per match instead of PNG folders")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel renders with --seeds")
+    p.add_argument("--save-replay", default=None, metavar="PATH", help="Also save a replay (a directory with --seeds)")
+
+    p = sub.add_parser("replay", help="Render a stored replay")
+    p.add_argument("replay", help="Replay file")
+
+    for p in sub.choices.values():
+        p.add_argument("--out", required=True, help="Output .gif file or directory for PNG frames")
+        p.add_argument("--every", type=int, default=AGENT_UPDATE_INTERVAL, help="Render every Nth tick")
+        p.add_argument("--tile-size", type=int, default=TILE_SIZE // 2, help="Tile size in pixels")
+        p.add_argument("--fps", type=int, default=20, help="GIF frame rate")
+    main(parser.parse_args())
@@ -1,28 +1,182 @@
+"""
+Runs a batch of matches between two teams, or a round-robin tournament between
+several, and saves the results in results.csv.
+
+Progress is kept in a job manifest, so an interrupted run can simply be started
+again: finished matches are skipped and only unfinished ones are played. Asking
+for more games later only plays the new ones.
+
+Results are also kept in a cache keyed by the teams' source code (see cache.py),
+so after one team changes, only the matches it plays are run again. Finished
+matches in the manifest remember their cache key as well, and are played again
+when it no longer matches.
+
+Usage:
+    python run_tests.py                                  # blu vs red, 20 games per colour
+    python run_tests.py blu red my_team --games 40 --workers 4
+    python run_tests.py blu red my_team --games 200 --dashboard
+    python run_tests.py --fresh                          # start over
+"""
+
 import os
-import subprocess
-
-def run(cmd):
-    subprocess.run(cmd, shell=True, check=True)
-
-print("Deleting old results.csv (if exists)...")
-if os.path.exists("results.csv"):
-    os.remove("results.csv")
-    
-with open("results.csv", "w") as f:
-    f.write("blue_team,red_team,winner,reason\n")
-
-print("Running: blu vs red (10 games)")
-for i in range(20):
-    print(f"  Game {i+1}")
-    run("python main.py blu red --headless")
-    
-with open("results.csv", "a") as f:
-    f.write("----,----,----,----\n")
-
-print("Running: red vs blu (10 games)")
-for i in range(20):
-    print(f"  Game {i+1}")
-    run("python main.py red blu --headless")
-
-print("Done.")
-print("Results saved in results.csv")
+import sys
+import time
+import argparse
+import traceback
+from collections import deque
+from multiprocessing import Pool
+from manifest import JobManifest, make_jobs
+from match import run_match
+from fairness import fair_seeds, SEEDS_PER_FAIR_SEED
+from dashboard import Dashboard
+from cache import ResultCache
+
+def _play(job):
+    """Runs one job in a worker process. Returns (key, result, error)."""
+    try:
+        start = time.perf_counter()
+        result = run_match(job["blue_team"], job["red_team"], seed=job["seed"])
+        result["seconds"] = time.perf_counter() - start
+        result["worker"] = os.getpid()
+        result["cache_key"] = job.get("cache_key")
+        return job["key"], result, None
+    except Exception:
+        return job["key"], None, traceback.format_exc(limit=3)
+
+def run_jobs(manifest, jobs, workers, on_result=None, on_start=None, on_poll=None):
+    """
+    Plays jobs in a process pool, recording every state change in the manifest.
+    The callbacks are called when a job finishes or starts, and on every pass of
+    the scheduling loop.
+    """
+    todo = deque(jobs)
+    in_flight = {}
+    with Pool(workers) as pool:
+        while todo or in_flight:
+            # Keep exactly one job per worker in flight, so "running" in the manifest is accurate
+            while todo and len(in_flight) < workers:
+                job = todo.popleft()
+                manifest.mark_running(job["key"])
+                in_flight[job["key"]] = pool.apply_async(_play, (job,))
+                if on_start:
+                    on_start(job)
+
+            if on_poll:
+                on_poll()
+            finished = [key for key, pending in in_flight.items() if pending.ready()]
+            if not finished:
+                time.sleep(0.01)
+                continue
+            for key in finished:
+                key, result, error = in_flight.pop(key).get()
+                if error:
+                    manifest.mark_failed(key, error)
+                    print(f"  {key}: FAILED\n{error}")
+                else:
+                    manifest.mark_done(key, result)
+                if on_result:
+                    on_result(key, result, error)
+
+def main(args):
+    if args.fresh and os.path.exists(args.manifest):
+        print(f"Deleting old manifest {args.manifest}...")
+        os.remove(args.manifest)
+
+    manifest = JobManifest(args.manifest)
+    seeds = None
+    if args.min_fairness:
+        # Only play on maps that do not favour either side
+        seeds = fair_seeds(args.games, args.min_fairness, args.seed,
+                           max_seed=args.seed + args.games * SEEDS_PER_FAIR_SEED)
+        if len(seeds) < args.games:
+            print(f"Only {len(seeds)} of {args.games * SEEDS_PER_FAIR_SEED} seeds have maps with a fairness "
+                  f"score of at least {args.min_fairness}, lower --min-fairness")
+            sys.exit(1)
+    jobs = make_jobs(args.teams, args.games, args.seed, seeds=seeds)
+    new = manifest.add_jobs(jobs)
+    # The manifest may hold jobs of other runs; only this run's teams and seeds count
+    keys = [job["key"] for job in jobs]
+
+    # Every result remembers the cache key it was played under. Finished matches
+    # whose teams, engine or rules have changed since are played again.
+    cache = ResultCache(args.cache)
+    cache_keys = {job["key"]: cache.key(job["blue_team"], job["red_team"], job["seed"]) for job in jobs}
+    stale = 0
+    for key in keys:
+        if manifest.status[key] == "done" and manifest.results[key].get("cache_key") != cache_keys[key]:
+            manifest.mark_pending(key)
+            stale += 1
+    todo = manifest.todo(keys)
+
+    if not args.no_cache:
+        # Matches whose teams, seed and engine are unchanged are not played again
+        remaining = []
+        for job in todo:
+            result = cache.get(cache_keys[job["key"]])
+            if result is None:
+                remaining.append(job)
+            else:
+                result.update(blue_team=job["blue_team"], red_team=job["red_team"], seed=job["seed"],
+                              cache_key=cache_keys[job["key"]], cached=True)
+                manifest.mark_done(job["key"], result)
+        todo = remaining
+    todo = [dict(job, cache_key=cache_keys[job["key"]]) for job in todo]
+
+    counts = manifest.counts(keys)
+    print(f"{len(keys)} matches in {args.manifest}: {counts['done']} done"
+          + (f" ({cache.hits} from the cache)" if cache.hits else "")
+          + f", {new} new" + (f", {stale} out of date" if stale else "") + f", {len(todo)} to play")
+
+    def report(key, result, error):
+        if result:
+            done = manifest.counts(keys)["done"]
+            print(f"  Game {done}/{len(keys)}: {key.replace('|', ' vs ', 1).replace('|', ', seed ')} "
+                  f"-> {result['winner']} ({result['reason']})")
+
+    if args.dashboard:
+        dashboard = Dashboard(len(keys), counts["done"], args.workers)
+        # Matches finished in an earlier run count towards the standings as well
+        for key in keys:
+            if manifest.status[key] == "done":
+                dashboard.add_result(manifest.results[key])
+        callbacks = {"on_result": dashboard.finished, "on_start": dashboard.started, "on_poll": dashboard.draw}
+    else:
+        callbacks = {"on_result": report}
+
+    if not args.no_cache:
+        show = callbacks["on_result"]
+        def remember(key, result, error):
+            if result:
+                cache.put(cache_keys[key], {k: v for k, v in result.items() if k not in ("seconds", "worker", "cache_key")})
+            show(key, result, error)
+        callbacks["on_result"] = remember
+
+    try:
+        run_jobs(manifest, todo, args.workers, **callbacks)
+    finally:
+        manifest.write_results_csv(args.results, keys)
+        manifest.close()
+        if args.dashboard:
+            dashboard.draw(force=True)
+
+    counts = manifest.counts(keys)
+    print("Done." if counts["done"] == len(keys) else f"{counts['failed']} matches failed, run again to retry.")
+    print(f"Results saved in {args.results}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch or round-robin tournament of headless matches")
+    parser.add_argument("teams", nargs="*", default=["blu", "red"], help="Team folders (default: blu red)")
+    parser.add_argument("--games", type=int, default=20, help="Games per pairing and colour (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--min-fairness", type=float, default=0, help="Only use seeds whose maps have at least this fairness score (0 to 1, see fairness.py)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel matches")
+    parser.add_argument("--manifest", default="runs/manifest.jsonl", help="Job manifest used to resume runs")
+    parser.add_argument("--results", default="results.csv", help="Results file, rewritten from the manifest")
+    parser.add_argument("--dashboard", "-D", action="store_true", help="Show a live dashboard instead of one line per game")
+    parser.add_argument("--cache", default=".cache/results", help="Result cache directory (default: .cache/results)")
+    parser.add_argument("--no-cache", action="store_true", help="Play every match, even if its result is cached")
+    parser.add_argument("--fresh", action="store_true", help="Delete the manifest and play everything again")
+    args = parser.parse_args()
+    if len(args.teams) < 2:
+        parser.error("at least two teams are needed")
+    main(args)
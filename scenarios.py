@@ -0,0 +1,356 @@
+"""
+Plays authored mid-game situations instead of full games, as a per-skill regression suite.
+
+A scenario is a JSON object (a file may also hold a list of them):
+
+    {
+        "name": "carrier_escape",
+        "skill": "flag_carrier",          # scenarios are summed up per skill
+        "team": "blue",                   # colour of the team under test (default: blue)
+        "opponent": "red",                # team folder of the other side (default: --opponent)
+        "map": [
+            "##########",
+            "#{ b   R}#",                 # walls, empty tiles, both flags and agents
+            "##########"
+        ],
+        "agents": [                       # optional details of agents drawn in the map, or more agents
+            {"color": "red", "position": [6, 1], "hp": 1, "ammo": 0, "cooldown": 2}
+        ],
+        "bullets": [{"color": "blue", "position": [4, 1], "direction": "right"}],
+        "shared_knowledge": {"blue": {"enemy_flag_pos": [7, 1]}},
+        "tick": 0,                        # starting tick, decides which ticks are agent frames
+        "max_ticks": 300,                 # ticks the scenario may last
+        "rules": {"AGENT_VISION_RANGE": 3},
+        "success": [{"won": true}],
+        "fail": [{"enemy_carrying": true}, {"allies_at_most": 0}],
+        "timeout": "fail",                # outcome when max_ticks pass (or "success")
+        "expect": 0.8                     # lowest acceptable success rate (optional)
+    }
+
+Map tiles are those of config.py: "b"/"r" are agents, "B"/"R" agents carrying the
+enemy flag (whose tile then marks its spawn). Agents get full hp and ammo
+unless an entry in "agents" at the same position says otherwise; entries at
+other positions add agents. In shared_knowledge, JSON arrays become tuples and
+keys like "3,4" become (3, 4), since agents usually keep positions as tuples.
+
+"success" and "fail" are lists of conditions; a scenario ends as soon as one of
+them holds (fail is checked first). A condition holds if all of its entries do,
+seen from the team under test:
+    won, lost          true, or the reason, e.g. "flag_capture" or "elimination"
+    carrying           whether the team carries the enemy flag
+    enemy_carrying     whether the enemy carries the team's flag
+    allies_at_most     number of the team's agents still alive
+    enemies_at_most    number of enemy agents still alive
+    reached            list of [x, y] tiles, one of which an agent of the team stands on
+    after              ticks since the start, e.g. {"after": 200, "carrying": true}
+If the game ends otherwise, the scenario fails.
+
+Usage:
+    python scenarios.py blu scenarios/ --opponent red --repeat 20 --workers 4
+"""
+
+import os
+import sys
+import json
+import copy
+import random
+import argparse
+from types import SimpleNamespace
+from multiprocessing import Pool
+from config import *
+
+DIRECTIONS = {"right": (1, 0), "left": (-1, 0), "up": (0, -1), "down": (0, 1)}
+AGENT_TILES = {
+    ASCII_TILES["blue_agent"]: ("blue", False),
+    ASCII_TILES["red_agent"]: ("red", False),
+    ASCII_TILES["blue_agent_f"]: ("blue", True),
+    ASCII_TILES["red_agent_f"]: ("red", True),
+}
+MAP_TILES = {ASCII_TILES["empty"], ASCII_TILES["wall"], ASCII_TILES["blue_flag"], ASCII_TILES["red_flag"], *AGENT_TILES}
+DEFAULT_MAX_TICKS = 500
+
+def _other(color):
+    return "red" if color == "blue" else "blue"
+
+def _alive(world, color):
+    return sum(1 for agent in world.agents if agent.color == color)
+
+def _carrying(world, color):
+    return any(agent.holding_flag for agent in world.agents if agent.color == color)
+
+def _won(world, color, value):
+    return world.win is not None and world.win[0] == color and (value is True or world.win[1] == value)
+
+# Condition entry -> test(world, value, team, ticks since the start)
+CONDITIONS = {
+    "won": lambda world, value, team, ticks: _won(world, team, value),
+    "lost": lambda world, value, team, ticks: _won(world, _other(team), value),
+    "carrying": lambda world, value, team, ticks: _carrying(world, team) == value,
+    "enemy_carrying": lambda world, value, team, ticks: _carrying(world, _other(team)) == value,
+    "allies_at_most": lambda world, value, team, ticks: _alive(world, team) <= value,
+    "enemies_at_most": lambda world, value, team, ticks: _alive(world, _other(team)) <= value,
+    "reached": lambda world, value, team, ticks: any(
+        list(agent.position) in value for agent in world.agents if agent.color == team),
+    "after": lambda world, value, team, ticks: ticks >= value,
+}
+
+# ---------- Loading ----------
+def _tuples(value):
+    """JSON arrays as tuples and "x,y" keys as (x, y), recursively."""
+    if isinstance(value, list):
+        return tuple(_tuples(item) for item in value)
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            parts = key.split(",")
+            if len(parts) > 1 and all(part.strip().lstrip("-").isdigit() for part in parts):
+                key = tuple(int(part) for part in parts)
+            result[key] = _tuples(item)
+        return result
+    return value
+
+def check_scenario(scenario):
+    """Raises ValueError if a scenario cannot be played."""
+    rows = scenario.get("map")
+    if not rows or any(len(row) != len(rows[0]) for row in rows):
+        raise ValueError("'map' must be a list of rows of equal length")
+    wall = ASCII_TILES["wall"]
+    if set(rows[0] + rows[-1] + "".join(row[0] + row[-1] for row in rows)) != {wall}:
+        raise ValueError("the map must be surrounded by walls")
+    tiles = "".join(rows)
+    unknown = set(tiles) - MAP_TILES
+    if unknown:
+        raise ValueError(f"unknown map tiles {sorted(unknown)}")
+    for flag in ("blue_flag", "red_flag"):
+        if tiles.count(ASCII_TILES[flag]) != 1:
+            raise ValueError(f"the map needs exactly one {flag.replace('_', ' ')}")
+    if scenario.get("team", "blue") not in ("blue", "red"):
+        raise ValueError("'team' must be blue or red")
+    if scenario.get("timeout", "fail") not in ("success", "fail"):
+        raise ValueError("'timeout' must be success or fail")
+    for spec in scenario.get("agents", []):
+        if spec.get("color") not in ("blue", "red") or len(spec.get("position", ())) != 2:
+            raise ValueError("every entry in 'agents' needs a color and a position")
+    for spec in scenario.get("bullets", []):
+        if spec.get("direction") not in DIRECTIONS or spec.get("color") not in ("blue", "red"):
+            raise ValueError("every bullet needs a color, a position and a direction")
+    for kind in ("success", "fail"):
+        for condition in scenario.get(kind, []):
+            unknown = set(condition) - set(CONDITIONS)
+            if unknown:
+                raise ValueError(f"unknown {kind} condition {sorted(unknown)}, expected some of {sorted(CONDITIONS)}")
+    GameConfig.from_rules(scenario.get("rules"))
+
+def load_scenarios(paths):
+    """Scenarios from JSON files and folders (searched recursively), sorted by name."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if name.endswith(".json"))
+        else:
+            files.append(path)
+
+    scenarios = []
+    for path in sorted(files):
+        with open(path) as f:
+            content = json.load(f)
+        entries = content if isinstance(content, list) else [content]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for i, scenario in enumerate(entries):
+            scenario.setdefault("name", stem if len(entries) == 1 else f"{stem}_{i}")
+            scenario.setdefault("skill", stem)
+            try:
+                check_scenario(scenario)
+            except ValueError as e:
+                raise ValueError(f"{path}, scenario '{scenario['name']}': {e}") from None
+            scenarios.append(scenario)
+    return sorted(scenarios, key=lambda scenario: scenario["name"])
+
+# ---------- Playing ----------
+def build_world(scenario, blue_agent_class, red_agent_class):
+    """A World in the scenario's state, ready for step()."""
+    from tournament import World, Flag, Bullet, AgentEngine
+
+    rows = scenario["map"]
+    height, width = len(rows), len(rows[0])
+    config = GameConfig.from_rules(scenario.get("rules")).replace(height=height, width=width)
+    start = scenario.get("tick", 0)
+    config = config.replace(max_ticks=start + scenario.get("max_ticks", DEFAULT_MAX_TICKS))
+    world = World(height, width, 0, blue_agent_class, red_agent_class, headless=True, config=config)
+
+    # Walls are the static map; everything else is placed on top of it
+    world.worldmap = [[ASCII_TILES["wall"] if tile == ASCII_TILES["wall"] else ASCII_TILES["empty"] for tile in row]
+                      for row in rows]
+    agents = {}
+    for y, row in enumerate(rows):
+        for x, tile in enumerate(row):
+            if tile == ASCII_TILES["blue_flag"]:
+                blue_flag = Flag("blue", (x, y))
+            elif tile == ASCII_TILES["red_flag"]:
+                red_flag = Flag("red", (x, y))
+            elif tile in AGENT_TILES:
+                color, carrying = AGENT_TILES[tile]
+                agents[(x, y)] = {"color": color, "position": (x, y), "carrying": carrying}
+    for spec in scenario.get("agents", []):
+        position = tuple(spec["position"])
+        agents[position] = {**agents.get(position, {}), **spec, "position": position}
+    world.flags = [blue_flag, red_flag]
+
+    classes = {"blue": blue_agent_class, "red": red_agent_class}
+    for color in ("blue", "red"):
+        team = [spec for spec in agents.values() if spec["color"] == color]
+        for index, spec in enumerate(team):
+            x, y = spec["position"]
+            if world.worldmap[y][x] == ASCII_TILES["wall"]:
+                raise ValueError(f"{color} agent at {spec['position']} stands in a wall")
+            engine = AgentEngine(color, spec["position"], classes[color], index, config)
+            engine.hp = spec.get("hp", config.agent_max_hp)
+            engine.ammo = spec.get("ammo", config.agent_max_ammo)
+            if spec.get("cooldown", 0) > 0:
+                engine.can_shoot = False
+                engine.can_shoot_countdown = spec["cooldown"]
+            if spec.get("carrying"):
+                flag = red_flag if color == "blue" else blue_flag
+                if flag.agent_holding:
+                    raise ValueError(f"two {color} agents carry the same flag")
+                flag.agent_holding = engine
+                engine.holding_flag = flag
+                engine.ascii_tile = ASCII_TILES[f"{color}_agent_f"]
+            world.agents.append(engine)
+
+    for spec in scenario.get("bullets", []):
+        # Bullets only take the colour and position of the agent that shot them
+        shooter = SimpleNamespace(color=spec["color"], position=tuple(spec["position"]))
+        world.bullets.append(Bullet(shooter, DIRECTIONS[spec["direction"]], config))
+
+    knowledge = scenario.get("shared_knowledge", {})
+    world.blue_shared_knowledge.update(_tuples(copy.deepcopy(knowledge.get("blue", {}))))
+    world.red_shared_knowledge.update(_tuples(copy.deepcopy(knowledge.get("red", {}))))
+    world.tick = start
+    world.last_progress_tick = start
+    return world
+
+def _matching(world, conditions, team, ticks):
+    for condition in conditions:
+        if all(CONDITIONS[name](world, value, team, ticks) for name, value in condition.items()):
+            return condition
+    return None
+
+def play_scenario(scenario, team_folder, opponent_folder, seed=None):
+    """Plays a scenario once. Returns a dict with its outcome ("success" or "fail"), reason and ticks."""
+    from match import load_agent_class
+
+    if seed is not None:
+        random.seed(seed)
+    team = scenario.get("team", "blue")
+    tested, opponent = load_agent_class(team_folder), load_agent_class(opponent_folder)
+    world = build_world(scenario, *((tested, opponent) if team == "blue" else (opponent, tested)))
+    start = world.tick
+
+    outcome = reason = None
+    while outcome is None:
+        agent_frame = world.step()
+        # Positions, hp and flags change on agent frames; the game can end on any tick
+        if not agent_frame and not world.win:
+            continue
+        world.check_win_state()
+        ticks = world.tick - start
+        for kind in ("fail", "success"):
+            condition = _matching(world, scenario.get(kind, []), team, ticks)
+            if condition is not None:
+                outcome, reason = kind, json.dumps(condition)
+                break
+        else:
+            if world.win == ("tied", "timeout"):
+                outcome, reason = scenario.get("timeout", "fail"), "timeout"
+            elif world.win:
+                outcome, reason = "fail", f"{world.win[0]} ({world.win[1]})"
+    if not world.win:
+        world.win = ("tied", "scenario_end")
+    world.terminate_agents()
+    return {"scenario": scenario["name"], "skill": scenario["skill"], "seed": seed,
+            "outcome": outcome, "reason": reason, "ticks": world.tick - start}
+
+def _play(task):
+    scenario, team_folder, opponent_folder, seed = task
+    try:
+        return play_scenario(scenario, team_folder, opponent_folder, seed)
+    except Exception as e:
+        # A crashing agent fails the scenario instead of stopping the whole suite
+        return {"scenario": scenario["name"], "skill": scenario["skill"], "seed": seed,
+                "outcome": "fail", "reason": f"error: {e!r}", "ticks": 0}
+
+# ---------- Report ----------
+def summarize(scenarios, results):
+    """Prints success rates per scenario and per skill. Returns the names of scenarios below their 'expect'."""
+    by_name = {}
+    for result in results:
+        by_name.setdefault(result["scenario"], []).append(result)
+
+    failing = []
+    skills = {}
+    print(f"{'scenario':<28} {'skill':<16} {'success':>9} {'rate':>6} {'ticks':>7}  most common failure")
+    for scenario in scenarios:
+        runs = by_name.get(scenario["name"], [])
+        if not runs:
+            continue
+        successes = sum(1 for run in runs if run["outcome"] == "success")
+        rate = successes / len(runs)
+        ticks = sum(run["ticks"] for run in runs) / len(runs)
+        reasons = [run["reason"] for run in runs if run["outcome"] == "fail"]
+        common = max(set(reasons), key=reasons.count) if reasons else ""
+        flag = ""
+        if rate < scenario.get("expect", 0):
+            failing.append(scenario["name"])
+            flag = f"  BELOW {scenario['expect']:.2f}"
+        print(f"{scenario['name']:<28} {scenario['skill']:<16} {successes:>4}/{len(runs):<4} {rate:>6.2f} "
+              f"{ticks:>7.0f}  {common}{flag}")
+        skill = skills.setdefault(scenario["skill"], [0, 0])
+        skill[0] += successes
+        skill[1] += len(runs)
+
+    print("\nPer skill:")
+    for skill, (successes, runs) in sorted(skills.items()):
+        print(f"  {skill:<24} {successes:>6}/{runs:<6} {successes / runs:.2f}")
+    return failing
+
+def main(args):
+    try:
+        scenarios = load_scenarios(args.paths)
+    except (OSError, ValueError) as e:
+        print(f"Error loading scenarios: {e}")
+        sys.exit(1)
+    if args.skill:
+        scenarios = [scenario for scenario in scenarios if scenario["skill"] in args.skill]
+    if not scenarios:
+        print("No scenarios found")
+        sys.exit(1)
+
+    tasks = [(scenario, args.team, scenario.get("opponent", args.opponent), args.seed + i)
+             for scenario in scenarios for i in range(args.repeat)]
+    print(f"Playing {len(scenarios)} scenarios x {args.repeat} seeds with {args.team}")
+    with Pool(args.workers) as pool:
+        results = list(pool.imap_unordered(_play, tasks, chunksize=max(1, len(tasks) // (8 * args.workers))))
+    print()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            for result in sorted(results, key=lambda result: (result["scenario"], result["seed"])):
+                f.write(json.dumps(result) + "\n")
+    failing = summarize(scenarios, results)
+    if failing:
+        print(f"\n{len(failing)} scenarios below their expected success rate: {', '.join(failing)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play authored mid-game scenarios as a regression suite")
+    parser.add_argument("team", help="Team folder under test")
+    parser.add_argument("paths", nargs="+", help="Scenario files or folders")
+    parser.add_argument("--opponent", default="red", help="Team folder of the other side, unless a scenario names one")
+    parser.add_argument("--repeat", type=int, default=10, help="Seeds per scenario (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="First seed")
+    parser.add_argument("--skill", nargs="+", default=None, help="Only play scenarios of these skills")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--out", default=None, help="Write every run as a JSON line")
+    main(parser.parse_args())
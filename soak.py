@@ -0,0 +1,216 @@
+"""
+Soak test: plays matches back-to-back in a single process for a long time and
+watches for problems that the usual one-process-per-batch runs hide.
+
+After every match it samples the engine throughput (ticks per second), the
+resident memory, the number of objects tracked by the garbage collector, open
+file handles and threads, and global interpreter state (sys.path, sys.modules)
+that loading teams could leave behind. Output that agents print while the game
+runs or from terminate() is counted too.
+
+At the end (or on Ctrl+C) the first and last windows of matches are compared
+and throughput degradation, memory or object growth and leaked state are
+reported. Every sample is also written to a CSV file for plotting.
+
+Usage:
+    python soak.py blu red --hours 2
+    python soak.py blu red --matches 500 --window 50 --log soak.csv
+"""
+
+import io
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from contextlib import redirect_stdout
+from statistics import median
+from match import load_agent_class
+from memprofile import peak_rss_kb
+from tournament import World
+from config import *
+
+SAMPLE_FIELDS = ("match", "blue_team", "red_team", "seed", "winner", "reason", "ticks", "seconds",
+                 "ticks_per_second", "rss_kb", "gc_objects", "open_files", "threads",
+                 "sys_modules", "sys_path", "play_output", "terminate_output")
+
+def rss_kb():
+    """Current resident set size in kB (falls back to the peak where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_kb()
+
+def open_files():
+    """Number of open file descriptors, or None if it cannot be read on this system."""
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(fd_dir):
+            return len(os.listdir(fd_dir)) - 1 # the listing itself uses one
+    return None
+
+class _CountingWriter(io.TextIOBase):
+    """Stand-in stdout that only counts (and remembers the first line of) what is printed."""
+
+    def __init__(self):
+        self.chars = 0
+        self.first_line = None
+
+    def write(self, text):
+        self.chars += len(text)
+        if self.first_line is None and text.strip():
+            self.first_line = text.strip().splitlines()[0]
+        return len(text)
+
+def play_match(blue_team_folder, red_team_folder, seed, config):
+    """Plays one headless match like match.run_match, timing it and capturing agent output."""
+    blue_agent_class = load_agent_class(blue_team_folder)
+    red_agent_class = load_agent_class(red_team_folder)
+    random.seed(seed)
+
+    play_output, terminate_output = _CountingWriter(), _CountingWriter()
+    start = time.perf_counter()
+    with redirect_stdout(play_output):
+        world = World(config.height, config.width, 0, blue_agent_class, red_agent_class, headless=True, config=config)
+        world.generate_world()
+        while not world.win:
+            world.step()
+    seconds = time.perf_counter() - start
+    with redirect_stdout(terminate_output):
+        world.terminate_agents()
+
+    winner, reason = world.win
+    return {"blue_team": blue_team_folder, "red_team": red_team_folder, "seed": seed,
+            "winner": winner, "reason": reason, "ticks": world.tick, "seconds": seconds,
+            "ticks_per_second": world.tick / seconds if seconds > 0 else 0.0,
+            "play_output": play_output, "terminate_output": terminate_output}
+
+def sample_process():
+    gc.collect()
+    return {"rss_kb": rss_kb(), "gc_objects": len(gc.get_objects()), "open_files": open_files(),
+            "threads": threading.active_count(), "sys_modules": len(sys.modules), "sys_path": len(sys.path)}
+
+def _window_median(samples, field):
+    values = [s[field] for s in samples if s[field] is not None]
+    return median(values) if values else None
+
+def analyze(samples, baseline, window, max_slowdown=0.2, max_growth_kb=50 * 1024, max_object_growth=0.1):
+    """
+    Compares the first and last `window` matches (after warm-up) and returns a
+    list of problems found. `baseline` is the interpreter state before the first match.
+    """
+    problems = []
+    if len(samples) < 2 * window:
+        return problems
+    first, last = samples[:window], samples[-window:]
+
+    fast, slow = _window_median(first, "ticks_per_second"), _window_median(last, "ticks_per_second")
+    if fast and slow < fast * (1 - max_slowdown):
+        problems.append(f"throughput dropped {100 * (1 - slow / fast):.0f}% ({fast:.0f} -> {slow:.0f} ticks/s)")
+
+    before, after = _window_median(first, "rss_kb"), _window_median(last, "rss_kb")
+    if before is not None and after - before > max_growth_kb:
+        problems.append(f"memory grew by {(after - before) / 1024:.1f} MB ({before / 1024:.1f} -> {after / 1024:.1f} MB)")
+
+    before, after = _window_median(first, "gc_objects"), _window_median(last, "gc_objects")
+    if after > before * (1 + max_object_growth):
+        problems.append(f"live objects grew from {before:.0f} to {after:.0f}")
+
+    for field, label in (("open_files", "open file handles"), ("threads", "threads")):
+        before, after = _window_median(first, field), _window_median(last, field)
+        if before is not None and after > before:
+            problems.append(f"{label} grew from {before:.0f} to {after:.0f}")
+
+    # Loading teams must leave the interpreter as it found it
+    end = samples[-1]
+    if end["sys_path"] != baseline["sys_path"]:
+        problems.append(f"sys.path changed from {baseline['sys_path']} to {end['sys_path']} entries")
+    if end["sys_modules"] > samples[0]["sys_modules"]:
+        problems.append(f"sys.modules grew from {samples[0]['sys_modules']} to {end['sys_modules']} modules")
+    return problems
+
+def main(args):
+    config = GameConfig.from_rules(json.loads(args.rules) if args.rules else None)
+    deadline = time.time() + args.hours * 3600 if args.hours else None
+    log = open(args.log, "w") if args.log else None
+    if log:
+        log.write(",".join(SAMPLE_FIELDS) + "\n")
+
+    baseline = sample_process()
+    baseline["sys_path_entries"] = list(sys.path)
+    samples, output_notes = [], {}
+    match_number, seed = 0, args.seed
+    print(f"Soak test: {args.blue_team_folder} vs {args.red_team_folder}, "
+          + (f"{args.hours} hours" if deadline else f"{args.matches} matches") + " (Ctrl+C to stop early)")
+    try:
+        while (match_number < args.matches) if deadline is None else (time.time() < deadline):
+            # Alternate colours, so both teams' code runs on both sides
+            teams = (args.blue_team_folder, args.red_team_folder)
+            blue, red = teams if match_number % 2 == 0 else teams[::-1]
+            result = play_match(blue, red, seed, config)
+            match_number += 1
+            seed += 1
+
+            for when in ("play_output", "terminate_output"):
+                writer = result[when]
+                result[when] = writer.chars
+                if writer.chars and (blue, when) not in output_notes:
+                    output_notes[(blue, when)] = writer.first_line
+
+            sample = {"match": match_number, **result, **sample_process()}
+            if log:
+                log.write(",".join(str(sample[field]) for field in SAMPLE_FIELDS) + "\n")
+                log.flush()
+            if match_number > args.warmup:
+                samples.append(sample)
+
+            if match_number % args.report_every == 0:
+                print(f"  match {match_number}: {sample['ticks_per_second']:.0f} ticks/s, "
+                      f"RSS {sample['rss_kb'] / 1024:.1f} MB, {sample['gc_objects']} objects, "
+                      f"{sample['open_files']} files, {sample['sys_modules']} modules")
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        if log:
+            log.close()
+
+    print(f"\nPlayed {match_number} matches.")
+    if sys.path != baseline["sys_path_entries"]:
+        added = [p for p in sys.path if p not in baseline["sys_path_entries"]]
+        print(f"  sys.path was modified, new entries: {added}")
+    for (team, when), line in output_notes.items():
+        print(f"  agents printed during {'terminate()' if when == 'terminate_output' else 'the game'} "
+              f"(first seen with {team} as blue): {line!r}")
+
+    window = min(args.window, len(samples) // 2)
+    if window < 1:
+        print("Not enough matches after warm-up to compare.")
+        return 0
+    problems = analyze(samples, baseline, window, args.max_slowdown, args.max_growth_mb * 1024, args.max_object_growth)
+    if problems:
+        print(f"Problems (first {window} vs last {window} matches after warm-up):")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print(f"No drift or leaks found (first {window} vs last {window} matches after warm-up).")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play matches back-to-back in one process and look for drift and leaks")
+    parser.add_argument("blue_team_folder")
+    parser.add_argument("red_team_folder")
+    parser.add_argument("--hours", type=float, default=None, help="Run for this long (instead of --matches)")
+    parser.add_argument("--matches", type=int, default=200, help="Number of matches (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--warmup", type=int, default=5, help="Matches ignored at the start (imports, caches)")
+    parser.add_argument("--window", type=int, default=50, help="Matches compared at the start and end")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="Allowed throughput drop (default: 0.2 = 20%%)")
+    parser.add_argument("--max-growth-mb", type=float, default=50, help="Allowed RSS growth in MB")
+    parser.add_argument("--max-object-growth", type=float, default=0.1, help="Allowed growth of live objects (0.1 = 10%%)")
+    parser.add_argument("--report-every", type=int, default=10, help="Print a status line every N matches")
+    parser.add_argument("--log", default=None, help="CSV file for the per-match samples")
+    parser.add_argument("--rules", default=None, help='JSON overrides of config.py, e.g. \'{"MAX_TICKS": 3000}\'')
+    sys.exit(main(parser.parse_args()))
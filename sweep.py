@@ -0,0 +1,146 @@
+"""
+Parameter sweeps over the game rules in config.py.
+
+Every parameter point (a combination of rule values) plays the same seeds,
+spread over a process pool, and the table shows how often games end by flag
+capture, elimination, timeout or stalemate, and how long they last.
+
+Parameters are given as NAME=values, where values is a comma separated list
+(1,2,4) or, for random sampling, a range lo:hi (integers if both ends are).
+
+Usage:
+    python sweep.py blu red --param SHOOT_COOLDOWN=2,4,8 --param AGENT_VISION_RANGE=3,4,6 --games 20
+    python sweep.py blu red --param HEAL_RESUPPLY_RATE=20:200 --param WALL_DENSITY=0.1:0.4 --random 12
+"""
+
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+import itertools
+from statistics import mean, median
+from multiprocessing import Pool
+from match import run_match
+from config import *
+
+REASONS = ("flag_capture", "elimination", "mutual_elimination", "timeout", "stalemate")
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_param(text):
+    """'NAME=1,2,4' -> ('NAME', [1, 2, 4]); 'NAME=0.1:0.4' -> ('NAME', (0.1, 0.4))"""
+    name, _, values = text.partition("=")
+    if not values:
+        raise ValueError(f"Expected NAME=values, got '{text}'")
+    if ":" in values:
+        lo, hi = values.split(":")
+        return name.upper(), (_parse_value(lo), _parse_value(hi))
+    return name.upper(), [_parse_value(v) for v in values.split(",")]
+
+def grid_points(params):
+    """Every combination of the listed values."""
+    names = list(params)
+    for values in params.values():
+        if isinstance(values, tuple):
+            raise ValueError("Ranges (lo:hi) need --random; list the values for a grid")
+    return [dict(zip(names, combo)) for combo in itertools.product(*params.values())]
+
+def random_points(params, count, rng):
+    """`count` points with every value drawn from its list or range."""
+    points = []
+    for _ in range(count):
+        point = {}
+        for name, values in params.items():
+            if isinstance(values, tuple):
+                lo, hi = values
+                point[name] = rng.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) \
+                    else round(rng.uniform(lo, hi), 4)
+            else:
+                point[name] = rng.choice(values)
+        points.append(point)
+    return points
+
+def _play(task):
+    point_index, blue, red, seed, rules = task
+    result = run_match(blue, red, seed=seed, rules=rules)
+    return point_index, blue, result
+
+def summarize(point, results, team_a):
+    """One table row: outcome shares and duration statistics of a point's (blue team, result) pairs."""
+    games = len(results)
+    ticks = [r["ticks"] for _, r in results]
+    wins_a = sum(1 for blue, r in results if (r["winner"] == "blue") == (blue == team_a) and r["winner"] != "tied")
+    ties = sum(1 for _, r in results if r["winner"] == "tied")
+    row = dict(point)
+    row["games"] = games
+    row["win_rate"] = round((wins_a + 0.5 * ties) / games, 3) if games else None
+    for reason in REASONS:
+        row[reason] = round(sum(1 for _, r in results if r["reason"] == reason) / games, 3) if games else None
+    row["mean_ticks"] = round(mean(ticks)) if ticks else None
+    row["median_ticks"] = round(median(ticks)) if ticks else None
+    return row
+
+def main(args):
+    try:
+        base = json.loads(args.rules) if args.rules else {}
+        params = dict(parse_param(p) for p in args.param)
+        points = random_points(params, args.random, random.Random(args.sample_seed)) if args.random else grid_points(params)
+        for point in points:
+            GameConfig.from_rules({**base, **point}) # fail early on unknown settings
+    except ValueError as e:
+        print(f"Invalid parameters: {e}")
+        sys.exit(1)
+
+    pairings = [(args.blue_team_folder, args.red_team_folder)]
+    if args.both_colours:
+        pairings.append((args.red_team_folder, args.blue_team_folder))
+    tasks = [(i, blue, red, seed, {**base, **point})
+             for i, point in enumerate(points)
+             for blue, red in pairings
+             for seed in range(args.seed, args.seed + args.games)]
+    print(f"{len(points)} parameter points, {len(tasks)} matches")
+
+    results = [[] for _ in points]
+    with Pool(args.workers) as pool:
+        for done, (i, blue, result) in enumerate(pool.imap_unordered(_play, tasks, chunksize=4), 1):
+            results[i].append((blue, result))
+            if done % max(1, len(tasks) // 10) == 0:
+                print(f"  {done}/{len(tasks)} matches")
+
+    rows = [summarize(point, point_results, args.blue_team_folder) for point, point_results in zip(points, results)]
+    columns = list(params) + ["games", "win_rate"] + list(REASONS) + ["mean_ticks", "median_ticks"]
+    widths = [max(len(c), *(len(str(row[c])) for row in rows)) for c in columns]
+    print()
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[c]).rjust(w) for c, w in zip(columns, widths)))
+    print(f"\nwin_rate is for {args.blue_team_folder} (ties count half); outcome columns are shares of games.")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Table saved in {args.csv}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep game rules and compare match outcomes")
+    parser.add_argument("blue_team_folder")
+    parser.add_argument("red_team_folder")
+    parser.add_argument("--param", action="append", required=True, metavar="NAME=VALUES",
+                        help="Rule to vary, e.g. SHOOT_COOLDOWN=2,4,8 or WALL_DENSITY=0.1:0.4 (repeatable)")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="Sample N random points instead of the full grid")
+    parser.add_argument("--sample-seed", type=int, default=0, help="Seed for --random sampling")
+    parser.add_argument("--games", type=int, default=20, help="Games per point and colour (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--both-colours", action="store_true", help="Also play with the colours swapped")
+    parser.add_argument("--rules", default=None, help='Fixed overrides for every point, e.g. \'{"STALEMATE_WINDOW": 1000}\'')
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--csv", default=None, help="Also save the table as CSV")
+    main(parser.parse_args())
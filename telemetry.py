@@ -0,0 +1,207 @@
+"""
+Spatial telemetry accumulated over many matches.
+
+Every event is counted in a per-team heatmap whose coordinates are relative to
+the team's own flag spawn, mirrored for red so that +x always points towards
+the enemy side. The heatmaps have shape (2*HEIGHT-1, 2*WIDTH-1) and the own
+flag is at their centre, so maps from different matches line up.
+
+Channels:
+    occupancy   agent positions, sampled every agent frame
+    bumps       moves into a wall
+    deaths      where agents died
+    shots       where agents fired from
+    hits        where agents were hit
+    pickups     where the enemy flag was picked up
+    drops       where a carrier was hit and dropped the flag
+
+Flag carry times (ticks from pickup to capture) are also collected per team.
+
+Usage:
+    python telemetry.py blu red --games 200 --workers 4 --out telemetry
+"""
+
+import os
+import argparse
+from multiprocessing import Pool
+import numpy as np
+from config import *
+
+CHANNELS = ("occupancy", "bumps", "deaths", "shots", "hits", "pickups", "drops")
+
+class Telemetry:
+
+    def __init__(self, height=HEIGHT, width=WIDTH):
+        self.height = height
+        self.width = width
+        self.shape = (2 * height - 1, 2 * width - 1)
+        self.maps = {}        # team -> channel -> 2D array
+        self.carry_times = {} # team -> list of ticks
+        self.matches = 0
+
+        # Per-match state, set by begin_match
+        self.tick = 0
+        self.frames = {}      # colour -> (team, maps, flag x, flag y, x direction)
+        self.carrying = {}
+
+    def _team_maps(self, team):
+        if team not in self.maps:
+            self.maps[team] = {channel: np.zeros(self.shape, dtype=np.uint32) for channel in CHANNELS}
+            self.carry_times[team] = []
+        return self.maps[team]
+
+    def begin_match(self, world, blue_team, red_team):
+        if (world.height, world.width) != (self.height, self.width):
+            raise ValueError(f"Telemetry for {self.width}x{self.height} maps cannot record a {world.width}x{world.height} match")
+        self.matches += 1
+        self.tick = world.tick
+        self.carrying = {}
+        blue_flag, red_flag = world.flags[0].spawn_position, world.flags[1].spawn_position
+        self.frames = {
+            "blue": (blue_team, self._team_maps(blue_team), blue_flag[0], blue_flag[1], 1),
+            "red": (red_team, self._team_maps(red_team), red_flag[0], red_flag[1], -1),
+        }
+
+    def _index(self, colour, position):
+        _, maps, fx, fy, dx = self.frames[colour]
+        return maps, (position[1] - fy + self.height - 1, (position[0] - fx) * dx + self.width - 1)
+
+    def record(self, channel, agent):
+        maps, index = self._index(agent.color, agent.position)
+        maps[channel][index] += 1
+        if channel == "pickups":
+            self.carrying[id(agent)] = self.tick
+        elif channel == "drops":
+            self.carrying.pop(id(agent), None)
+
+    def record_capture(self, agent):
+        picked_up = self.carrying.pop(id(agent), None)
+        if picked_up is not None:
+            team = self.frames[agent.color][0]
+            self.carry_times[team].append(self.tick - picked_up)
+
+    def on_agent_frame(self, world):
+        self.tick = world.tick
+        for agent in world.agents:
+            maps, index = self._index(agent.color, agent.position)
+            maps["occupancy"][index] += 1
+
+    # ---------- Merging and export ----------
+    def merge(self, other):
+        """Adds another Telemetry's counts (e.g. from a worker process) into this one."""
+        if other.shape != self.shape:
+            raise ValueError(f"Cannot merge telemetry of shape {other.shape} into {self.shape}")
+        for team, maps in other.maps.items():
+            mine = self._team_maps(team)
+            for channel, array in maps.items():
+                mine[channel] += array
+            self.carry_times[team].extend(other.carry_times[team])
+        self.matches += other.matches
+        return self
+
+    def __getstate__(self):
+        # Per-match state refers to live agents and is not worth sending between processes
+        state = self.__dict__.copy()
+        state["frames"] = {}
+        state["carrying"] = {}
+        return state
+
+    def save(self, path):
+        arrays = {"matches": np.array(self.matches), "size": np.array([self.height, self.width])}
+        for team, maps in self.maps.items():
+            for channel, array in maps.items():
+                arrays[f"{team}/{channel}"] = array
+            arrays[f"{team}/carry_times"] = np.array(self.carry_times[team], dtype=np.int32)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        telemetry = cls(*data["size"])
+        telemetry.matches = int(data["matches"])
+        for key in data.files:
+            if "/" not in key:
+                continue
+            team, channel = key.rsplit("/", 1)
+            telemetry._team_maps(team)
+            if channel == "carry_times":
+                telemetry.carry_times[team] = data[key].tolist()
+            else:
+                telemetry.maps[team][channel] += data[key]
+        return telemetry
+
+    def save_heatmap(self, team, channel, path, scale=8):
+        """Saves one heatmap as a PNG (log-scaled, black to red to yellow to white)."""
+        import pygame # only needed for image export
+
+        counts = self.maps[team][channel].astype(np.float64)
+        if counts.max() > 0:
+            counts = np.log1p(counts) / np.log1p(counts.max())
+        rgb = np.stack([
+            np.clip(counts * 3, 0, 1),
+            np.clip(counts * 3 - 1, 0, 1),
+            np.clip(counts * 3 - 2, 0, 1),
+        ], axis=-1)
+        rgb = (rgb * 255).astype(np.uint8)
+        # Mark the own flag spawn in blue
+        rgb[self.height - 1, self.width - 1] = (0, 128, 255)
+        rgb = rgb.repeat(scale, axis=0).repeat(scale, axis=1)
+        # surfarray expects (x, y, colour)
+        surface = pygame.surfarray.make_surface(rgb.transpose(1, 0, 2))
+        pygame.image.save(surface, path)
+
+    def export(self, directory):
+        """Writes telemetry.npz and one PNG per team and channel to a directory."""
+        os.makedirs(directory, exist_ok=True)
+        self.save(os.path.join(directory, "telemetry.npz"))
+        for team in self.maps:
+            name = os.path.basename(os.path.normpath(team))
+            for channel in CHANNELS:
+                self.save_heatmap(team, channel, os.path.join(directory, f"{name}_{channel}.png"))
+
+
+def _run_games(task):
+    """Worker process: plays a range of seeds and returns their merged telemetry."""
+    from match import run_match
+    blue_team, red_team, seeds = task
+    telemetry = Telemetry()
+    for seed in seeds:
+        run_match(blue_team, red_team, seed=seed, telemetry=telemetry)
+    return telemetry
+
+def main(args):
+    pairings = [(args.blue_team_folder, args.red_team_folder)]
+    if args.both_colours:
+        pairings.append((args.red_team_folder, args.blue_team_folder))
+
+    # Split the seeds into one chunk per worker and pairing
+    seeds = list(range(args.seed, args.seed + args.games))
+    chunks = [seeds[i::args.workers] for i in range(args.workers)]
+    tasks = [(blue, red, chunk) for blue, red in pairings for chunk in chunks if chunk]
+
+    telemetry = Telemetry()
+    with Pool(args.workers) as pool:
+        for part in pool.imap_unordered(_run_games, tasks):
+            telemetry.merge(part)
+
+    if args.merge and os.path.isfile(args.merge):
+        telemetry.merge(Telemetry.load(args.merge))
+
+    telemetry.export(args.out)
+    print(f"Telemetry of {telemetry.matches} matches saved in {args.out}")
+    for team, times in telemetry.carry_times.items():
+        if times:
+            print(f"  {team}: {len(times)} captures, flag carried home in "
+                  f"{np.mean(times):.0f} ticks on average (median {np.median(times):.0f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect spatial telemetry heatmaps over many matches")
+    parser.add_argument("blue_team_folder")
+    parser.add_argument("red_team_folder")
+    parser.add_argument("--games", type=int, default=100, help="Games per pairing")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--both-colours", action="store_true", help="Also play with the colours swapped")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--merge", default=None, help="Existing telemetry.npz to add to the new results")
+    parser.add_argument("--out", default="telemetry", help="Output directory")
+    main(parser.parse_args())
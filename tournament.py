@@ -1,12 +1,24 @@
 import time
 import random
-import copy
 import os
+import copy
+import warnings
+from functools import lru_cache
 from config import *
+from fairness import analyze_map, bfs_distances
+
+# The first agents of a team spawn at these (forward, down) offsets from their flag;
+# larger teams fill up rings of growing distance around it.
+CLASSIC_SPAWN_OFFSETS = [(2, 0), (0, 2), (0, -2)]
+
+# Maps generated at most per game when looking for one that is fair enough
+MAP_ATTEMPTS = 100
 
 class World:
 
-    def __init__(self, height, width, tick_rate, blue_agent_class, red_agent_class, headless=False, ascii_mode=False):
+    def __init__(self, height, width, tick_rate, blue_agent_class, red_agent_class, headless=False, ascii_mode=False, config=None):
+        # `config` holds all rules of the match; height, width and tick_rate override it
+        self.config = (GameConfig() if config is None else config).replace(height=height, width=width, tick_rate=tick_rate)
         self.height = height
         self.width = width
         self.tick_rate = tick_rate
@@ -18,6 +30,7 @@ class World:
         self.tick = 0
         self.worldmap = None
         self.worldmap_buffer = None
+        self._buffered_positions = [] # tiles of worldmap_buffer that hold dynamic objects
         self.win = None # Becomes a tuple (winner, reason)
         
         self.agents = []
@@ -26,6 +39,92 @@ class World:
         
         self.blue_shared_knowledge = {}
         self.red_shared_knowledge = {}
+
+        # Progress tracking for stalemate detection (only used if stalemate_window is set)
+        self.last_progress_tick = 0
+        self._closest_approach = {"blue": float("inf"), "red": float("inf")}
+        self._enemy_flag_distances = None
+        self._hp = {}
+        self._flag_carriers = None
+
+        self.telemetry = None
+        # Time spent in Agent.update and number of calls, per team
+        self.update_time = {"blue": 0.0, "red": 0.0}
+        self.update_calls = {"blue": 0, "red": 0}
+
+    def attach_telemetry(self, telemetry, blue_team="blue", red_team="red"):
+        """Starts recording spatial telemetry for this game (call after generate_world)."""
+        self.telemetry = telemetry
+        for agent in self.agents:
+            agent.telemetry = telemetry
+        telemetry.begin_match(self, blue_team, red_team)
+
+    def attach_recorder(self, recorder, colors=("blue", "red"), match_id=0):
+        """Starts recording the observations and actions of these teams' agents (call after generate_world)."""
+        for agent in self.agents:
+            if agent.color in colors:
+                agent.recorder = recorder
+        recorder.begin_match(self, match_id)
+
+    def swap_agent_class(self, color, agent_class, keep_knowledge=True):
+        """
+        Replaces the Agent instances of a team with new ones of agent_class (e.g.
+        after its code was reloaded). Engine state such as positions, hp and a
+        carried flag is kept. If construction fails, the old agents stay.
+        """
+        engines = [agent for agent in self.agents if agent.color == color]
+        new_agents = [engine._make_agent(agent_class) for engine in engines]
+        for engine, agent in zip(engines, new_agents):
+            engine._use_agent(agent, agent_class)
+        if color == "blue":
+            self.blue_agent_class = agent_class
+        else:
+            self.red_agent_class = agent_class
+        if not keep_knowledge:
+            (self.blue_shared_knowledge if color == "blue" else self.red_shared_knowledge).clear()
+
+    def snapshot(self):
+        """Saves the game state (not the agents' own memory) for restore()."""
+        return {
+            "tick": self.tick,
+            "flags": [copy.copy(flag) for flag in self.flags],
+            "bullets": [copy.copy(bullet) for bullet in self.bullets],
+            "agents": [copy.copy(agent) for agent in self.agents],
+            "blue_shared_knowledge": copy.deepcopy(self.blue_shared_knowledge),
+            "red_shared_knowledge": copy.deepcopy(self.red_shared_knowledge),
+            "closest_approach": dict(self._closest_approach),
+        }
+
+    def restore(self, snapshot):
+        """
+        Returns the game, including shared knowledge, to a snapshot. Agents are
+        created anew from the current agent classes, so they start without
+        memory of the game so far.
+        """
+        self.tick = snapshot["tick"]
+        self.win = None
+        self.last_progress_tick = self.tick
+        self.flags = [copy.copy(flag) for flag in snapshot["flags"]]
+        self.bullets = [copy.copy(bullet) for bullet in snapshot["bullets"]]
+        self.agents = []
+        for saved in snapshot["agents"]:
+            engine = copy.copy(saved)
+            agent_class = self.blue_agent_class if engine.color == "blue" else self.red_agent_class
+            engine._use_agent(engine._make_agent(agent_class), agent_class)
+            if engine.holding_flag:
+                # Carried flags are the restored copies, not the ones in the snapshot
+                engine.holding_flag = self.flags[1] if engine.color == "blue" else self.flags[0]
+                engine.holding_flag.agent_holding = engine
+            self.agents.append(engine)
+        self.blue_shared_knowledge.clear()
+        self.blue_shared_knowledge.update(copy.deepcopy(snapshot["blue_shared_knowledge"]))
+        self.red_shared_knowledge.clear()
+        self.red_shared_knowledge.update(copy.deepcopy(snapshot["red_shared_knowledge"]))
+
+        # Stalemate tracking starts over from the snapshot, not from the discarded future
+        self._closest_approach = dict(snapshot["closest_approach"])
+        self._hp = {agent: agent.hp for agent in self.agents}
+        self._flag_carriers = tuple(flag.agent_holding for flag in self.flags)
     
     def _clear_area(self, x, y):
         for yi in [-1, 0, 1]:
@@ -33,24 +132,25 @@ class World:
                 self.worldmap[y+yi][x+xi] = ASCII_TILES["empty"]
     
     def _clear_random_path(self, flag_blue_pos, flag_red_pos):
+        width, height = self.config.width, self.config.height
         position = flag_blue_pos
-        while position[0] < (WIDTH+1)/2:
+        while position[0] < (width+1)/2:
             self.worldmap[position[1]][position[0]] = ASCII_TILES["empty"]
             r = random.random()
             if r > 0.75 and position[1] > 3:
                 position = (position[0], position[1]-1)
-            elif r > 0.5 and position[1] < HEIGHT-4:
+            elif r > 0.5 and position[1] < height-4:
                 position = (position[0], position[1]+1)
             else:
                 position = (position[0]+1, position[1])
         position_left = position
         position = flag_red_pos
-        while position[0] > (WIDTH-1)/2:
+        while position[0] > (width-1)/2:
             self.worldmap[position[1]][position[0]] = ASCII_TILES["empty"]
             r = random.random()
             if r > 0.75 and position[1] > 3:
                 position = (position[0], position[1]-1)
-            elif r > 0.5 and position[1] < HEIGHT-4:
+            elif r > 0.5 and position[1] < height-4:
                 position = (position[0], position[1]+1)
             else:
                 position = (position[0]-1, position[1])
@@ -67,14 +167,43 @@ class World:
             do_vertical_line = False
         if do_vertical_line:
             for yi in range(beg_y, end_y):
-                self.worldmap[yi][WIDTH//2] = ASCII_TILES["empty"]
-
-    def generate_world(self):
+                self.worldmap[yi][width//2] = ASCII_TILES["empty"]
+
+    def _spawn_positions(self, flag_pos, forward, count):
+        """
+        Spawn tiles around a flag, nearest first, keeping clear of the outer walls
+        and on the team's own half of the map, so the teams never share a tile.
+        Raises ValueError if the map is too small for count agents.
+        """
+        offsets = list(CLASSIC_SPAWN_OFFSETS)
+        distance = 2
+        while len(offsets) < count + 4 * distance:
+            ring = {(dx, sign * (distance - abs(dx))) for dx in range(-distance, distance + 1) for sign in (1, -1)}
+            offsets += sorted(ring - set(offsets), key=lambda o: (-o[0], abs(o[1]), o[1]))
+            distance += 1
+
+        half = self.width // 2
+        positions = []
+        for dx, dy in offsets:
+            x, y = flag_pos[0] + dx * forward, flag_pos[1] + dy
+            own_half = x < half if forward == 1 else x >= self.width - half
+            if 2 <= x <= self.width - 3 and 2 <= y <= self.height - 3 and own_half:
+                positions.append((x, y))
+                if len(positions) == count:
+                    break
+        if len(positions) < count:
+            side = "left" if forward == 1 else "right"
+            raise ValueError(f"Only {len(positions)} of {count} spawn tiles fit on the {side} half of a "
+                             f"{self.width}x{self.height} map; use a larger map or a smaller TEAM_SIZE")
+        return positions
+
+    def _generate_map(self):
+        """Lays out walls, flags and spawn tiles. Returns (flag positions, spawn positions) per team."""
         self.worldmap = [[ASCII_TILES["empty"] for _ in range(self.width)] for _ in range(self.height)]
 
         for y in range(len(self.worldmap)):
             for x in range(len(self.worldmap[0])):
-                if random.random() > 0.7 and (y != 1 and y != self.height-2):
+                if random.random() > 1 - self.config.wall_density and (y != 1 and y != self.height-2):
                     self.worldmap[y][x] = ASCII_TILES["wall"]
                 if x == 0 or x == self.width-1 or y == 0 or y == self.height-1:
                     self.worldmap[y][x] = ASCII_TILES["wall"]
@@ -83,37 +212,66 @@ class World:
         flag_y = random.randint(4, self.height - 5)
         flag_blue_pos = (flag_x, flag_y)
         self._clear_area(flag_x, flag_y)
-        self.flags.append( Flag("blue", (flag_x, flag_y)) )
-
-        self.agents.append( AgentEngine("blue", (flag_x + 2, flag_y), self.blue_agent_class) )
-        self._clear_area(flag_x + 2, flag_y)
-        self.agents.append( AgentEngine("blue", (flag_x, flag_y + 2), self.blue_agent_class) )
-        self._clear_area(flag_x, flag_y + 2)
-        self.agents.append( AgentEngine("blue", (flag_x, flag_y - 2), self.blue_agent_class) )
-        self._clear_area(flag_x, flag_y - 2)
+        blue_spawns = self._spawn_positions(flag_blue_pos, 1, self.config.team_size)
+        for position in blue_spawns:
+            self._clear_area(*position)
 
         flag_x = random.randint(self.width - 6, self.width - 4)
         flag_y = random.randint(4, self.height - 5)
         flag_red_pos = (flag_x, flag_y)
         self._clear_area(flag_x, flag_y)
-        self.flags.append( Flag("red", (flag_x, flag_y)) )
-
-        self.agents.append( AgentEngine("red", (flag_x - 2, flag_y), self.red_agent_class) )
-        self._clear_area(flag_x - 2, flag_y)
-        self.agents.append( AgentEngine("red", (flag_x, flag_y + 2), self.red_agent_class) )
-        self._clear_area(flag_x, flag_y + 2)
-        self.agents.append( AgentEngine("red", (flag_x, flag_y - 2), self.red_agent_class) )
-        self._clear_area(flag_x, flag_y - 2)
+        red_spawns = self._spawn_positions(flag_red_pos, -1, self.config.team_size)
+        for position in red_spawns:
+            self._clear_area(*position)
 
         self._clear_random_path(flag_blue_pos, flag_red_pos)
+        return (flag_blue_pos, flag_red_pos), (blue_spawns, red_spawns)
+
+    def generate_world(self):
+        # Maps can be regenerated until they are fair enough (see fairness.py)
+        best = None
+        for attempt in range(MAP_ATTEMPTS):
+            (flag_blue_pos, flag_red_pos), (blue_spawns, red_spawns) = self._generate_map()
+            if self.config.min_map_fairness <= 0:
+                break
+            report = analyze_map(self.worldmap, flag_blue_pos, flag_red_pos, blue_spawns, red_spawns, self.config)
+            if report["score"] >= self.config.min_map_fairness:
+                break
+            if best is None or report["score"] > best[0]:
+                best = (report["score"], self.worldmap, (flag_blue_pos, flag_red_pos), (blue_spawns, red_spawns))
+        else:
+            score, self.worldmap, (flag_blue_pos, flag_red_pos), (blue_spawns, red_spawns) = best
+            warnings.warn(f"No map out of {MAP_ATTEMPTS} reached MIN_MAP_FAIRNESS {self.config.min_map_fairness}, "
+                          f"playing the fairest one (score {score})")
+
+        self.flags.append( Flag("blue", flag_blue_pos) )
+        self.flags.append( Flag("red", flag_red_pos) )
+        for color, spawns, agent_class in (("blue", blue_spawns, self.blue_agent_class),
+                                           ("red", red_spawns, self.red_agent_class)):
+            for index, position in enumerate(spawns):
+                self.agents.append( AgentEngine(color, position, agent_class, index, self.config) )
 
     def buffer_worldmap(self):
-        self.worldmap_buffer = copy.deepcopy(self.worldmap)
+        # The buffer is kept between ticks: only the tiles that held bullets, agents
+        # or flags are restored from the static map, so the cost does not grow with
+        # the map size.
+        if self.worldmap_buffer is None:
+            self.worldmap_buffer = [row[:] for row in self.worldmap]
+        buffer = self.worldmap_buffer
+        for x, y in self._buffered_positions:
+            buffer[y][x] = self.worldmap[y][x]
+
+        positions = []
         for obj in self.bullets + self.agents:
-            self.worldmap_buffer[obj.position[1]][obj.position[0]] = obj.ascii_tile
+            x, y = obj.position
+            buffer[y][x] = obj.ascii_tile
+            positions.append((x, y))
         for flag in self.flags:
             if not flag.agent_holding:
-                self.worldmap_buffer[flag.position[1]][flag.position[0]] = flag.ascii_tile
+                x, y = flag.position
+                buffer[y][x] = flag.ascii_tile
+                positions.append((x, y))
+        self._buffered_positions = positions
 
     def ascii_display(self):
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -122,6 +280,24 @@ class World:
         for row in self.worldmap_buffer:
             print(" " + " ".join(row))
 
+    def step(self):
+        """Advances the game by one tick. Returns True if this was an agent frame."""
+        self.check_win_state()
+        self.buffer_worldmap()
+
+        agent_frame = self.tick % self.config.agent_update_interval == 0
+        if agent_frame:
+            self.update_agents()
+        elif self.config.think_budget > 0:
+            for agent in self.agents:
+                if agent.thinks:
+                    agent.think(self.config.think_budget)
+        if (self.tick + 1) % self.config.bullet_update_interval == 0:
+            self.update_bullets()
+
+        self.iter()
+        return agent_frame
+
     def iter(self):
         # Sleep to control simulation speed for visualization (GUI or ASCII).
         # In pure headless mode (no GUI, no ASCII), run as fast as possible.
@@ -139,8 +315,13 @@ class World:
             agent.collision(self)
             agent.update_can_shoot()
 
+        if self.telemetry:
+            self.telemetry.on_agent_frame(self)
+        if self.config.stalemate_window:
+            self._track_progress()
+
         # Agents heal and resupply if near their home flag spawn point
-        if self.tick % HEAL_RESUPPLY_RATE == 0:
+        if self.tick % self.config.heal_resupply_rate == 0:
             for agent in self.agents:
                 agent.heal_and_resupply(self)
 
@@ -148,12 +329,51 @@ class World:
         for i in range(len(self.agents)-1, -1, -1):
             agent = self.agents[i]
             if agent.hp <= 0:
+                if self.telemetry:
+                    self.telemetry.record("deaths", agent)
                 agent.terminate(reason = "died")
                 del self.agents[i]
     
+    def _track_progress(self):
+        """
+        Notes the tick of the last progress: a team getting closer to the enemy
+        flag than ever before, an agent losing hp or dying, or a flag being
+        picked up or dropped.
+        """
+        if self._enemy_flag_distances is None:
+            # Walking distances to each team's target, computed once per map
+            self._enemy_flag_distances = {
+                "blue": bfs_distances(self.worldmap, self.flags[1].spawn_position),
+                "red": bfs_distances(self.worldmap, self.flags[0].spawn_position),
+            }
+        progress = False
+        hp = {}
+        for agent in self.agents:
+            hp[agent] = agent.hp
+            if agent.hp < self._hp.get(agent, agent.hp):
+                progress = True
+            distance = self._enemy_flag_distances[agent.color].get(agent.position, float("inf"))
+            if distance < self._closest_approach[agent.color]:
+                self._closest_approach[agent.color] = distance
+                progress = True
+        if len(hp) < len(self._hp):
+            progress = True # somebody died
+        self._hp = hp
+
+        carriers = tuple(flag.agent_holding for flag in self.flags)
+        if carriers != self._flag_carriers:
+            progress = True
+        self._flag_carriers = carriers
+        if progress:
+            self.last_progress_tick = self.tick
+
     def update_bullets(self):
+        # Index agents by tile once, so each bullet only looks at its own tile
+        agents_at = {}
+        for agent in self.agents:
+            agents_at.setdefault(agent.position, []).append(agent)
         for i in range(len(self.bullets)-1, -1, -1):
-            hit = self.bullets[i].update(self.worldmap_buffer, self.agents)
+            hit = self.bullets[i].update(self.worldmap_buffer, agents_at)
             if hit:
                 del self.bullets[i]
     
@@ -173,8 +393,11 @@ class World:
             self.win = ("blue", "elimination")
         elif blue_count == 0:
             self.win = ("red", "elimination")
-        elif self.tick >= MAX_TICKS:
+        elif self.tick >= self.config.max_ticks:
             self.win = ("tied", "timeout")
+        elif self.config.stalemate_window and self.tick - self.last_progress_tick >= self.config.stalemate_window \
+                and not self.bullets and not any(flag.agent_holding for flag in self.flags):
+            self.win = ("tied", "stalemate")
     
     def terminate_agents(self):
         for agent in self.agents:
@@ -196,25 +419,30 @@ class Flag:
 
 
 class Bullet:
-    def __init__(self, agent, direction):
+    def __init__(self, agent, direction, config=None):
         self.color = agent.color
         self.direction = direction
         self.position = agent.position
         self.ascii_tile = ASCII_TILES["bullet"]
+        self.config = GameConfig() if config is None else config
     
-    def update(self, worldmap_buffer, agents):
+    def update(self, worldmap_buffer, agents_at):
+        """Moves the bullet. `agents_at` maps positions to the agents standing there."""
         # Move the bullet one step
         self.position = (self.position[0] + self.direction[0], self.position[1] + self.direction[1])
+        x, y = self.position
+        if not (0 <= x < self.config.width and 0 <= y < self.config.height):
+            return True # Left the map (only possible on maps without outer walls)
         
         hit_confirmed = False
         # Check for collision with any enemy agents at the new position
-        for agent in agents:
-            if agent.position == self.position and agent.color != self.color:
+        for agent in agents_at.get(self.position, ()):
+            if agent.color != self.color:
                 agent.take_damage(1)
                 hit_confirmed = True
                 
         # Check for collision with a wall
-        tile = worldmap_buffer[self.position[1]][self.position[0]]
+        tile = worldmap_buffer[y][x]
         if tile == ASCII_TILES["wall"]:
             return True # Hit a wall, bullet is destroyed
             
@@ -240,34 +468,89 @@ def _bresenham_line(x1, y1, x2, y2):
             err += dx
             y1 += sy
 
+@lru_cache(maxsize=None)
+def _sight_lines(vision_range):
+    """Each tile of the vision window with the tiles on the line of sight to it from the centre."""
+    size = vision_range*2+1
+    return tuple(
+        (x, y, tuple(_bresenham_line(vision_range, vision_range, x, y)))
+        for y in range(size) for x in range(size)
+    )
+
+@lru_cache(maxsize=None)
+def _flat_sight_lines(vision_range):
+    """Same as _sight_lines, with tiles as offsets into a row-major buffer of the window."""
+    size = vision_range*2+1
+    return tuple(
+        (y*size + x, tuple(y_online*size + x_online for x_online, y_online in line))
+        for x, y, line in _sight_lines(vision_range)
+    )
+
+# Ways an agent can receive `visible_world`, declared with an `observation` class attribute
+OBSERVATIONS = ("grid", "rows", "buffer", "delta")
+
 class AgentEngine:
-    blue_index = 0
-    red_index = 0
 
-    def __init__(self, color, position, agent_class):
+    def __init__(self, color, position, agent_class, index, config=None):
+        self.config = GameConfig() if config is None else config
         self.color = color
         self.position = position
         self.prev_position = self.position
         
-        self.hp = AGENT_MAX_HP
-        self.ammo = AGENT_MAX_AMMO
+        self.hp = self.config.agent_max_hp
+        self.ammo = self.config.agent_max_ammo
         
         self.can_shoot = True
         self.can_shoot_countdown = 0
         
         self.holding_flag = None
+        self.telemetry = None
+        self.recorder = None
 
+        self.index = index
         if self.color == "blue":
-            self.index = AgentEngine.blue_index
-            AgentEngine.blue_index += 1
             self.ascii_tile = ASCII_TILES["blue_agent"]
         elif self.color == "red":
-            self.index = AgentEngine.red_index
-            AgentEngine.red_index += 1
             self.ascii_tile = ASCII_TILES["red_agent"]
         
-        self.agent = agent_class(self.color, self.index)
+        self._use_agent(self._make_agent(agent_class), agent_class)
+
+    def _make_agent(self, agent_class):
+        observation = getattr(agent_class, "observation", "grid")
+        if observation not in OBSERVATIONS:
+            raise ValueError(f"Unknown observation '{observation}', expected one of {OBSERVATIONS}")
+        # Agents that need the match settings (e.g. the map size) ask for them
+        if getattr(agent_class, "wants_config", False):
+            return agent_class(self.color, self.index, self.config)
+        return agent_class(self.color, self.index)
+
+    def _use_agent(self, agent, agent_class):
+        self.agent = agent
+        # Agents with a think() method get CPU time on the ticks between agent frames
+        self.thinks = callable(getattr(agent, "think", None))
+        self.think_debt = 0.0
+        self.observation = getattr(agent_class, "observation", "grid")
+        # Reused every agent frame instead of building new lists
+        size = self.config.agent_vision_range*2+1
+        self._vision = bytearray(size*size)
+        self._prev_vision = bytearray(size*size)
+        self._prev_vision_position = None
+        self._vision_view = memoryview(self._vision).toreadonly().cast("B", (size, size))
             
+    def think(self, budget):
+        """
+        Calls agent.think with this tick's budget in seconds. Time spent over
+        the budget is taken from the following ticks, so an agent that overruns
+        skips thinking until it has paid its debt.
+        """
+        if self.think_debt >= budget:
+            self.think_debt -= budget
+            return
+        allowed = budget - self.think_debt
+        start = time.perf_counter()
+        self.agent.think(allowed)
+        self.think_debt = max(0.0, time.perf_counter() - start - allowed)
+
     def terminate(self, reason):
         if self.holding_flag:
             self.holding_flag.agent_holding = None
@@ -276,8 +559,12 @@ class AgentEngine:
     def take_damage(self, amount):
         """Reduces the agent's health. If holding a flag, drops it."""
         self.hp -= amount
+        if self.telemetry:
+            self.telemetry.record("hits", self)
 
         if self.holding_flag:
+            if self.telemetry:
+                self.telemetry.record("drops", self)
             # Reset the flag's state, returning it to its spawn
             self.holding_flag.position = self.holding_flag.spawn_position
             self.holding_flag.agent_holding = None
@@ -297,36 +584,99 @@ class AgentEngine:
         # Calculate Manhattan distance to the flag's spawn point
         distance = abs(self.position[0] - flag_pos[0]) + abs(self.position[1] - flag_pos[1])
         
-        if distance <= HEAL_RESUPPLY_RANGE:
+        if distance <= self.config.heal_resupply_range:
             # Heal one HP if not at max
-            if self.hp < AGENT_MAX_HP:
+            if self.hp < self.config.agent_max_hp:
                 self.hp += 1
             # Restore one ammo if not at max
-            if self.ammo < AGENT_MAX_AMMO:
+            if self.ammo < self.config.agent_max_ammo:
                 self.ammo += 1
 
     def get_visible_world(self, world):
+        vision_range = self.config.agent_vision_range
         visible_world = []
         
-        for y in range(0, AGENT_VISION_RANGE*2+1):
-            y_world = self.position[1] + y - AGENT_VISION_RANGE
+        for y in range(0, vision_range*2+1):
+            y_world = self.position[1] + y - vision_range
             visible_world.append([])
-            for x in range(0, AGENT_VISION_RANGE*2+1):
-                x_world = self.position[0] + x - AGENT_VISION_RANGE
+            for x in range(0, vision_range*2+1):
+                x_world = self.position[0] + x - vision_range
                 if 0 <= x_world < world.width and 0 <= y_world < world.height:
                     visible_world[-1].append(world.worldmap_buffer[y_world][x_world])
                 else:
                     visible_world[-1].append(ASCII_TILES["unknown"])
                     
-        agent_x, agent_y = AGENT_VISION_RANGE, AGENT_VISION_RANGE
-        for y in range(len(visible_world)):
-            for x in range(len(visible_world[0])):
-                for x_online, y_online in _bresenham_line(agent_x, agent_y, x, y):
-                    if visible_world[y_online][x_online] == ASCII_TILES["wall"]:
-                        visible_world[y][x] = ASCII_TILES["unknown"]
-                        break
+        # Lines of sight are the same for every agent frame, so they are computed once
+        wall, unknown = ASCII_TILES["wall"], ASCII_TILES["unknown"]
+        for x, y, line in _sight_lines(vision_range):
+            for x_online, y_online in line:
+                if visible_world[y_online][x_online] == wall:
+                    visible_world[y][x] = unknown
+                    break
         return visible_world
     
+    def _fill_vision(self, world):
+        """Writes the masked window around the agent into self._vision as ASCII bytes."""
+        vision_range = self.config.agent_vision_range
+        vision = self._vision
+        unknown = ord(ASCII_TILES["unknown"])
+        px, py = self.position
+
+        i = 0
+        for y_world in range(py - vision_range, py + vision_range + 1):
+            row = world.worldmap_buffer[y_world] if 0 <= y_world < world.height else None
+            for x_world in range(px - vision_range, px + vision_range + 1):
+                vision[i] = ord(row[x_world]) if row is not None and 0 <= x_world < world.width else unknown
+                i += 1
+
+        wall = ord(ASCII_TILES["wall"])
+        for i, line in _flat_sight_lines(vision_range):
+            for j in line:
+                if vision[j] == wall:
+                    vision[i] = unknown
+                    break
+
+    def _vision_delta(self):
+        """World tiles of the window that differ from what this agent saw last frame."""
+        vision_range = self.config.agent_vision_range
+        size = vision_range*2+1
+        vision, prev = self._vision, self._prev_vision
+        px, py = self.position
+        changes = []
+        if self._prev_vision_position is None:
+            dx = dy = size # nothing seen before
+        else:
+            dx = px - self._prev_vision_position[0]
+            dy = py - self._prev_vision_position[1]
+
+        i = 0
+        for y in range(size):
+            prev_y = y + dy
+            for x in range(size):
+                prev_x = x + dx
+                tile = vision[i]
+                if not (0 <= prev_x < size and 0 <= prev_y < size) or prev[prev_y*size + prev_x] != tile:
+                    changes.append((px + x - vision_range, py + y - vision_range, chr(tile)))
+                i += 1
+
+        prev[:] = vision
+        self._prev_vision_position = self.position
+        return changes
+
+    def observe(self, world):
+        """Returns visible_world in the form the agent class asked for."""
+        if self.observation == "grid":
+            return self.get_visible_world(world)
+
+        self._fill_vision(world)
+        if self.observation == "buffer":
+            return self._vision_view
+        if self.observation == "rows":
+            size = self.config.agent_vision_range*2+1
+            text = self._vision.decode("ascii")
+            return tuple(text[i:i+size] for i in range(0, size*size, size))
+        return self._vision_delta()
+
     def _handle_movement(self, direction):
         self.prev_position = self.position
         x, y = self.position
@@ -335,22 +685,26 @@ class AgentEngine:
         elif direction == "up":    self.position = (x, y-1)
         elif direction == "down":  self.position = (x, y+1)
         self.can_shoot = False
-        self.can_shoot_countdown = SHOOT_COOLDOWN
+        self.can_shoot_countdown = self.config.shoot_cooldown
 
     def _handle_shooting(self, world, direction):
-        if   direction == "right": world.bullets.append( Bullet(self, direction=(1, 0)) )
-        elif direction == "left":  world.bullets.append( Bullet(self, direction=(-1, 0)) )
-        elif direction == "up":    world.bullets.append( Bullet(self, direction=(0, -1)) )
-        elif direction == "down":  world.bullets.append( Bullet(self, direction=(0, 1)) )
+        if   direction == "right": world.bullets.append( Bullet(self, (1, 0), self.config) )
+        elif direction == "left":  world.bullets.append( Bullet(self, (-1, 0), self.config) )
+        elif direction == "up":    world.bullets.append( Bullet(self, (0, -1), self.config) )
+        elif direction == "down":  world.bullets.append( Bullet(self, (0, 1), self.config) )
         self.ammo -= 1
+        if self.telemetry:
+            self.telemetry.record("shots", self)
         self.can_shoot = False
-        self.can_shoot_countdown = SHOOT_COOLDOWN
+        self.can_shoot_countdown = self.config.shoot_cooldown
 
     def control(self, world):
         knowledge_base = world.blue_shared_knowledge if self.color == "blue" else world.red_shared_knowledge
-        
+        visible_world = self.observe(world)
+
+        start = time.perf_counter()
         action, direction = self.agent.update(
-            self.get_visible_world(world),
+            visible_world,
             self.position,
             self.can_shoot,
             self.holding_flag,
@@ -358,6 +712,12 @@ class AgentEngine:
             self.hp,
             self.ammo
         )
+        world.update_time[self.color] += time.perf_counter() - start
+        world.update_calls[self.color] += 1
+        if self.recorder:
+            if self.observation == "grid":
+                self._fill_vision(world) # the other forms have already filled it
+            self.recorder.record(self, world, action, direction)
 
         if action == "move":
             self._handle_movement(direction)
@@ -368,6 +728,8 @@ class AgentEngine:
         x, y = self.position
         if world.worldmap[y][x] == ASCII_TILES["wall"]:
             self.position = self.prev_position
+            if self.telemetry:
+                self.telemetry.record("bumps", self)
             return True
         return False
 
@@ -387,11 +749,15 @@ class AgentEngine:
             self.holding_flag = enemy_flag_obj
             enemy_flag_obj.agent_holding = self
             self.ascii_tile = ASCII_TILES["blue_agent_f"] if self.color == "blue" else ASCII_TILES["red_agent_f"]
+            if self.telemetry:
+                self.telemetry.record("pickups", self)
         
         # Interact with friendly flag
         elif world.worldmap_buffer[y][x] == friendly_flag_tile:
             if self.holding_flag:
                 world.win = (self.color, "flag_capture")
+                if self.telemetry:
+                    self.telemetry.record_capture(self)
             else: # collision
                 self.position = self.prev_position
 
@@ -0,0 +1,129 @@
+"""
+Tunes an agent's constants with successive halving.
+
+A team exposes its tunable constants in agent.py as a module-level dict
+PARAMS (the defaults) and PARAM_SPACE, which gives a (lo, hi) range (integers
+if both ends are) or a list of choices for each of them:
+
+    PARAMS = {"forward_bias": 0.7, "recent_length": 6}
+    PARAM_SPACE = {"forward_bias": (0.0, 2.0), "recent_length": (2, 16)}
+
+The tuner samples candidate settings (the defaults are always one of them) and
+plays them against reference opponents in both colours. After each round only
+the best third is kept and the survivors play three times as many games, so
+most games are spent on promising candidates. All candidates play the same
+seeds, which makes their results directly comparable.
+
+Usage:
+    python tune.py blu --opponents red --candidates 27 --min-games 4 --workers 4
+"""
+
+import os
+import sys
+import json
+import math
+import random
+import argparse
+from multiprocessing import Pool
+from match import load_agent_module, run_match
+
+def sample_params(space, rng):
+    params = {}
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            lo, hi = values
+            params[name] = rng.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) \
+                else round(rng.uniform(lo, hi), 3)
+        else:
+            params[name] = rng.choice(values)
+    return params
+
+def _play(task):
+    """Returns the tuned team's score of one game: 1 for a win, 0.5 for a tie, 0 for a loss."""
+    candidate, team, params, opponent, seed, team_is_blue, rules = task
+    if team_is_blue:
+        result = run_match(team, opponent, seed=seed, rules=rules, blue_params=params)
+        color = "blue"
+    else:
+        result = run_match(opponent, team, seed=seed, rules=rules, red_params=params)
+        color = "red"
+    score = 1.0 if result["winner"] == color else 0.5 if result["winner"] == "tied" else 0.0
+    return candidate, score
+
+def successive_halving(team, candidates, opponents, min_games, eta, pool, first_seed=0, rules=None):
+    """
+    Plays rounds until the next one would only keep one candidate. Returns the score lists of all
+    candidates and the ranking of the last round (the best candidate first).
+    """
+    scores = [[] for _ in candidates]
+    alive = list(range(len(candidates)))
+    seeds_played = 0
+    games = min_games
+    round_number = 1
+    while True:
+        # Only the new seeds are played; earlier games of the survivors still count
+        seeds = range(first_seed + seeds_played, first_seed + games)
+        tasks = [(i, team, candidates[i], opponent, seed, team_is_blue, rules)
+                 for i in alive for opponent in opponents for seed in seeds for team_is_blue in (True, False)]
+        for i, score in pool.imap_unordered(_play, tasks, chunksize=2):
+            scores[i].append(score)
+        seeds_played = games
+
+        alive.sort(key=lambda i: -sum(scores[i]) / len(scores[i]))
+        print(f"\nRound {round_number}: {len(alive)} candidates, {len(scores[alive[0]])} games each")
+        for rank, i in enumerate(alive[:10], 1):
+            print(f"  {rank:>2}. #{i:<3} score {sum(scores[i]) / len(scores[i]):.3f}  {json.dumps(candidates[i])}")
+        keep = math.ceil(len(alive) / eta)
+        if keep <= 1:
+            return scores, alive
+        alive = alive[:keep]
+        games *= eta
+        round_number += 1
+
+def main(args):
+    try:
+        module = load_agent_module(args.team)
+    except (ImportError, FileNotFoundError) as e:
+        print(f"Error loading agent: {e}")
+        sys.exit(1)
+    defaults = getattr(module, "PARAMS", None)
+    space = getattr(module, "PARAM_SPACE", None)
+    if not isinstance(defaults, dict) or not isinstance(space, dict):
+        print(f"{args.team}/agent.py must define PARAMS and PARAM_SPACE dicts to be tuned")
+        sys.exit(1)
+
+    rules = json.loads(args.rules) if args.rules else None
+    rng = random.Random(args.sample_seed)
+    candidates = [dict(defaults)] + [{**defaults, **sample_params(space, rng)} for _ in range(args.candidates - 1)]
+    print(f"Tuning {', '.join(space)} of {args.team} against {', '.join(args.opponents)}: "
+          f"{len(candidates)} candidates, {args.min_games} seeds per opponent and colour in the first round")
+
+    with Pool(args.workers) as pool:
+        scores, ranking = successive_halving(args.team, candidates, args.opponents, args.min_games,
+                                             args.eta, pool, args.seed, rules)
+
+    best = ranking[0]
+    print(f"\nBest: #{best} with score {sum(scores[best]) / len(scores[best]):.3f} over {len(scores[best])} games "
+          f"(defaults: {sum(scores[0]) / len(scores[0]):.3f} over {len(scores[0])} games)")
+    print(f"PARAMS = {json.dumps(candidates[best], indent=4)}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(candidates[best], f, indent=4)
+        print(f"Saved in {args.out}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune an agent's PARAMS with successive halving")
+    parser.add_argument("team", help="Team folder whose agent.py defines PARAMS and PARAM_SPACE")
+    parser.add_argument("--opponents", nargs="+", default=["red"], help="Reference opponent team folders")
+    parser.add_argument("--candidates", type=int, default=27, help="Settings to try, including the defaults")
+    parser.add_argument("--min-games", type=int, default=4, help="Seeds per opponent and colour in the first round")
+    parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta of the candidates per round, with eta times the games")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game")
+    parser.add_argument("--sample-seed", type=int, default=0, help="Seed for sampling candidates")
+    parser.add_argument("--rules", default=None, help='JSON overrides of config.py, e.g. \'{"STALEMATE_WINDOW": 1000}\'')
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--out", default=None, help="Save the best PARAMS as JSON")
+    args = parser.parse_args()
+    if args.eta < 2:
+        parser.error("--eta must be at least 2, or no candidates are ever dropped")
+    main(args)
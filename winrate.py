@@ -1,82 +1,168 @@
-import pandas as pd
+"""
+Win/tie/timeout statistics for results.csv, keyed by team names.
 
-SEP = "----"
-
-def norm(x) -> str:
-    if pd.isna(x):
-        return ""
-    return str(x).strip().lower()
-
-def main(csv_path: str,
-         winner_col: str = "winner",
-         reason_col: str = "reason") -> None:
+Streams the CSV row by row (old "----" separator rows are skipped), so it
+handles millions of results in constant memory. Confidence intervals are
+bootstrapped by resampling the outcome counts of every matchup at once.
 
-    df = pd.read_csv(csv_path)
+Usage:
+    python winrate.py [results.csv] [--bootstrap 10000] [--confidence 0.95]
+"""
 
-    for c in (winner_col, reason_col):
-        if c not in df.columns:
-            raise ValueError(f"Missing column '{c}'. Found: {list(df.columns)}")
+import csv
+import argparse
+from collections import Counter, defaultdict
+import numpy as np
 
-    # normalize
-    df["_winner_raw"] = df[winner_col].map(norm)
-    df["_reason"] = df[reason_col].map(norm)
-
-    # assign block index based on -------
-    block = -1
-    blocks = []
+SEP = "----"
 
-    for w in df["_winner_raw"]:
-        if w == SEP:
-            block += 1
-            blocks.append(None)  # separator row
+def norm(x) -> str:
+    return (x or "").strip().lower()
+
+class MatchupStats:
+    """Outcome counts of one pair of teams, seen from `team`'s point of view."""
+
+    def __init__(self, team, opponent):
+        self.team = team
+        self.opponent = opponent
+        # colour of `team` -> Counter of "win" / "loss" / "tie"
+        self.outcomes = {"blue": Counter(), "red": Counter()}
+        # (winning team or "tie", reason) -> count
+        self.reasons = Counter()
+
+    def add(self, team_colour, winner, reason):
+        if winner == "tied":
+            outcome = "tie"
+            self.reasons[("tie", reason)] += 1
+        elif winner == team_colour:
+            outcome = "win"
+            self.reasons[(self.team, reason)] += 1
         else:
-            if block == -1:
-                block = 0
-            blocks.append(block)
-
-    df["_block"] = blocks
-
-    # izbaci separator retke
-    df = df[df["_block"].notna()].copy()
-    df["_block"] = df["_block"].astype(int)
-
-    # expected winner by block parity
-    df["_expected"] = df["_block"].apply(lambda b: "blue" if b % 2 == 0 else "red")
-
-    # ukupni zbroj razloga
-    reason_counts = df["_reason"].value_counts()
-    timeout = int(reason_counts.get("timeout", 0))
-    flag_capture = int(reason_counts.get("flag_capture", 0))
-
-    # winrate (samo decided)
-    decided = df[df["_winner_raw"].isin(["blue", "red"])].copy()
-    decided["_correct"] = decided["_winner_raw"] == decided["_expected"]
-
-    decided_total = len(decided)
-    correct = int(decided["_correct"].sum())
-    wrong = decided_total - correct
-    winrate = (correct / decided_total) * 100 if decided_total else 0.0
+            outcome = "loss"
+            self.reasons[(self.opponent, reason)] += 1
+        self.outcomes[team_colour][outcome] += 1
+        if reason == "timeout":
+            self.outcomes[team_colour]["timeout"] += 1
+
+    def counts(self, colour=None):
+        """Returns (wins, ties, losses, timeouts) for one colour or both."""
+        colours = [colour] if colour else ["blue", "red"]
+        total = Counter()
+        for c in colours:
+            total.update(self.outcomes[c])
+        return total["win"], total["tie"], total["loss"], total["timeout"]
+
+def read_results(csv_path, winner_col="winner", reason_col="reason"):
+    """Streams the results file and returns a dict of MatchupStats keyed by team pair."""
+    matchups = {}
+    # (blue team, red team) -> (MatchupStats, colour of its `team`)
+    pairings = {}
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = [c.strip() for c in next(reader, [])]
+        for c in ("blue_team", "red_team", winner_col, reason_col):
+            if c not in header:
+                raise ValueError(f"Missing column '{c}'. Found: {header}")
+        blue_i, red_i = header.index("blue_team"), header.index("red_team")
+        winner_i, reason_i = header.index(winner_col), header.index(reason_col)
+
+        for row in reader:
+            if len(row) < len(header):
+                continue
+            winner = norm(row[winner_i])
+            if winner == SEP or not winner:
+                continue
+
+            pairing = (row[blue_i], row[red_i])
+            if pairing not in pairings:
+                blue, red = pairing[0].strip(), pairing[1].strip()
+                # Each pair of teams is reported once, from the alphabetically first team's side
+                team, opponent = sorted((blue, red))
+                if (team, opponent) not in matchups:
+                    matchups[(team, opponent)] = MatchupStats(team, opponent)
+                pairings[pairing] = (matchups[(team, opponent)], "blue" if team == blue else "red")
+
+            stats, colour = pairings[pairing]
+            stats.add(colour, winner, norm(row[reason_i]))
+    return matchups
+
+def bootstrap_win_rates(counts, resamples=10000, confidence=0.95, seed=0):
+    """
+    Bootstraps the win rate (ties count as half a win) for many count triples at once.
+    `counts` is an array of shape (n, 3) with wins, ties and losses per row.
+    Returns an array of shape (n, 2) with the lower and upper bounds.
+    """
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, 3)
+    totals = counts.sum(axis=1)
+    probs = counts / np.maximum(totals, 1)[:, None]
+    probs[totals == 0] = (1, 0, 0)
+    rng = np.random.default_rng(seed)
+    alpha = (1 - confidence) / 2
+
+    # Resampling n games with replacement is the same as drawing the outcome counts
+    # from a multinomial, which costs O(resamples) rather than O(resamples * n).
+    # Rows are processed in chunks to bound memory with many matchups.
+    bounds = np.empty((len(counts), 2))
+    chunk = max(1, 1000000 // resamples)
+    for start in range(0, len(counts), chunk):
+        n = totals[start:start + chunk]
+        samples = rng.multinomial(n, probs[start:start + chunk], size=(resamples, len(n)))
+        rates = (samples[..., 0] + 0.5 * samples[..., 1]) / np.maximum(n, 1)
+        bounds[start:start + chunk] = np.quantile(rates, [alpha, 1 - alpha], axis=0).T
+    bounds[totals == 0] = np.nan
+    return bounds
+
+def _row(label, counts, bounds):
+    wins, ties, losses, timeouts = counts
+    games = wins + ties + losses
+    if games == 0:
+        return f"  {label:<12} {0:>6}"
+    rate = (wins + 0.5 * ties) / games * 100
+    return (f"  {label:<12} {games:>6} {wins / games * 100:>6.1f}% {ties / games * 100:>6.1f}% "
+            f"{losses / games * 100:>6.1f}% {timeouts / games * 100:>7.1f}%   "
+            f"{rate:>5.1f}% [{bounds[0] * 100:.1f}, {bounds[1] * 100:.1f}]")
+
+def main(csv_path, resamples=10000, confidence=0.95,
+         winner_col="winner", reason_col="reason"):
+
+    matchups = read_results(csv_path, winner_col, reason_col)
+    if not matchups:
+        print("No results.")
+        return
+
+    # one row per (matchup, colour filter), bootstrapped together
+    colours = (None, "blue", "red")
+    rows = [(stats, colour) for stats in matchups.values() for colour in colours]
+    counts = [stats.counts(colour) for stats, colour in rows]
+    bounds = bootstrap_win_rates([c[:3] for c in counts], resamples, confidence)
+
+    totals = defaultdict(int)
+    for stats in matchups.values():
+        for (who, reason), n in stats.reasons.items():
+            totals[reason] += n
 
-    # report
     print("=== TOTALS ===")
-    print(f"Valid rows:   {len(df)}")
-    print(f"flag_capture: {flag_capture}")
-    print(f"timeout:      {timeout}")
-
-    print("\n=== BLOCK-BASED WINRATE ===")
-    print(f"Decided games: {decided_total}")
-    print(f"Correct:       {correct}")
-    print(f"Wrong:         {wrong}")
-    print(f"Winrate:       {winrate:.2f}%")
-
-    if wrong > 0:
-        print("\n=== MISMATCHES ===")
-        print(
-            decided.loc[~decided["_correct"],
-                        ["_block", winner_col, reason_col, "_expected"]]
-            .rename(columns={"_block": "block", "_expected": "expected"})
-            .to_string(index=False)
-        )
+    print(f"Games: {sum(sum(s.counts()[:3]) for s in matchups.values())}")
+    for reason, n in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"{reason + ':':<20} {n}")
+
+    for m, stats in enumerate(matchups.values()):
+        print(f"\n=== {stats.team} vs {stats.opponent} ===")
+        print(f"  {'':<12} {'games':>6} {'win':>7} {'tie':>7} {'loss':>7} {'timeout':>8}   "
+              f"win rate [{confidence * 100:.0f}% CI]")
+        for c, colour in enumerate(colours):
+            i = m * len(colours) + c
+            label = stats.team if colour is None else f"as {colour}"
+            print(_row(label, counts[i], bounds[i]))
+
+        print("  Reasons:")
+        for (who, reason), n in sorted(stats.reasons.items(), key=lambda item: -item[1]):
+            print(f"    {who + ' ' + reason:<30} {n}")
 
 if __name__ == "__main__":
-    main("results.csv")
+    parser = argparse.ArgumentParser(description="Win rate statistics for results.csv")
+    parser.add_argument("csv_path", nargs="?", default="results.csv", help="Results file (default: results.csv)")
+    parser.add_argument("--bootstrap", type=int, default=10000, help="Bootstrap resamples (default: 10000)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level (default: 0.95)")
+    args = parser.parse_args()
+    main(args.csv_path, args.bootstrap, args.confidence)